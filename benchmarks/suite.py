@@ -0,0 +1,499 @@
+"""
+Benchmarks the processing pipeline on a synthetic meeting (see benchmarks/synthetic.py)
+and writes the results as JSON, to compare between commits:
+
+    uv run python -m benchmarks.suite --output before.json
+    git checkout my-branch
+    uv run python -m benchmarks.suite --output after.json --compare before.json
+
+Measured:
+- scene_detection: get_scene_frames on the video, and how well it finds the known cuts,
+  in the configured, full and fast modes
+- text_filter: how well find_text_regions tells slides from gallery views, and its cost
+- dedup: which slide changes SceneDeduplicator skips OCR for (cursor, popup, webcam) and
+  which it keeps (an added bullet, a replaced word, a changed figure)
+- ocr: process_ocr_easyocr with a loaded reader, and how many slide words it finds
+- compose: compose_meeting_text on a long meeting, with and without compaction
+- db: saving events in batches like run_worker does, on SQLite
+- api: /take-notes and /job throughput on SQLite, with the worker pools and the LLM stubbed
+
+Config overrides are passed through, e.g. `ocr.dedup.enabled=false`. Everything is
+written to a temporary directory, including the SQLite database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import cv2
+from hydra import compose, initialize_config_dir
+from omegaconf import DictConfig, OmegaConf, open_dict
+from benchmarks.synthetic import DEDUP_CASES, PALETTES, SyntheticMeeting, make_meeting, render_dedup_cases
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+BENCHMARKS = ("scene_detection", "text_filter", "dedup", "ocr", "compose", "db", "api")
+# A detected cut this close to a real one counts as found
+CUT_TOLERANCE = 0.5
+API_KEY = "benchmark"
+
+
+def load_config(overrides: List[str]) -> DictConfig:
+    """
+    The server config on the local SQLite fallback, without result caching since
+    the same video is uploaded again and again.
+    """
+    with initialize_config_dir(config_dir=CONFIG_DIR, version_base=None):
+        cfg = compose(config_name="config", overrides=["~db", *overrides])
+    with open_dict(cfg):
+        cfg.server.auth.keys = [API_KEY]
+        cfg.cache.enabled = False
+    return cfg
+
+
+def percentiles(values: List[float]) -> dict:
+    if not values:
+        return {}
+    p95 = statistics.quantiles(values, n=20, method="inclusive")[-1] if len(values) > 1 else values[0]
+    return {"p50": statistics.median(values), "p95": p95, "max": max(values)}
+
+
+def best_of(repeats: int, fn: Callable[[], object]) -> tuple:
+    """
+    Runs fn repeats times and returns the fastest time with the last result.
+    """
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def match_cuts(detected: List[float], expected: List[float]) -> dict:
+    errors = []
+    for cut in expected:
+        nearest = min(detected, key=lambda d: abs(d - cut), default=None)
+        if nearest is not None and abs(nearest - cut) <= CUT_TOLERANCE:
+            errors.append(abs(nearest - cut))
+    return {
+        "expected_cuts": len(expected),
+        "detected_cuts": len(detected),
+        "found_cuts": len(errors),
+        "mean_cut_error_seconds": statistics.mean(errors) if errors else None,
+    }
+
+
+def bench_scene_detection(meeting: SyntheticMeeting, cfg: DictConfig, repeats: int) -> dict:
+    """
+    Runs get_scene_frames with the configured ocr.scenes, and in full and fast mode
+    to report the speedup of fast mode over the full pass.
+    """
+    from mink.ocr import get_scene_frames
+
+    results = {}
+    configured = OmegaConf.create(OmegaConf.to_container(cfg.ocr.get("scenes") or {}))
+    modes = {"configured": configured}
+    for mode, fast in (("full", False), ("fast", True)):
+        modes[mode] = OmegaConf.merge(configured, {"fast": fast})
+    for mode, scenes_cfg in modes.items():
+        seconds, scenes = best_of(repeats, lambda: list(get_scene_frames(meeting.path, scenes_cfg)))
+        results[mode] = {
+            "seconds": seconds,
+            "realtime_factor": meeting.duration / seconds,
+            "frames_per_second": meeting.frame_count / seconds,
+            "scenes": len(scenes),
+            **match_cuts([start for _, start, _ in scenes[1:]], meeting.cuts),
+        }
+    results["video_seconds"] = meeting.duration
+    results["fast_speedup"] = results["full"]["seconds"] / results["fast"]["seconds"]
+    return results
+
+
+def bench_text_filter(meeting: SyntheticMeeting, cfg: DictConfig, repeats: int) -> dict:
+    """
+    Runs the OpenCV text check on the scene frames. A slide frame it finds no text
+    on (missed_text) loses that slide's text, a gallery frame it finds text on only
+    costs an OCR call.
+    """
+    from mink.ocr import find_text_regions, get_scene_frames
+
+    min_area = float((cfg.ocr.get("text_filter") or {}).get("min_area", 0.0005))
+    scenes = list(get_scene_frames(meeting.path, cfg.ocr.get("scenes")))
+    truth = []
+    for _, start, end in scenes:
+        middle = (start + end) / 2
+        slide = next((s for s in meeting.slides if s.start <= middle < s.end), meeting.slides[-1])
+        truth.append(bool(slide.lines))
+
+    seconds, found = best_of(
+        repeats, lambda: [bool(find_text_regions(frame, min_area)) for frame, _, _ in scenes]
+    )
+    return {
+        "frames": len(scenes),
+        "frames_with_text": sum(truth),
+        "ms_per_frame": seconds / len(scenes) * 1000,
+        "skip_ratio": found.count(False) / len(scenes),
+        "missed_text": sum(1 for t, f in zip(truth, found) if t and not f),
+        "false_text": sum(1 for t, f in zip(truth, found) if f and not t),
+    }
+
+
+def bench_dedup(meeting: SyntheticMeeting, cfg: DictConfig, repeats: int) -> dict:
+    """
+    Runs SceneDeduplicator on a slide followed by each of DEDUP_CASES, on every palette.
+    The frames are JPEG-compressed to add the noise of a decoded video. A wrong skip
+    loses the slide edit, a wrong keep only costs an OCR call.
+    """
+    from mink.ocr import SceneDeduplicator
+
+    def decoded(image):
+        _, data = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 75])
+        return cv2.cvtColor(cv2.imdecode(data, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+
+    pairs = []
+    for index in range(len(PALETTES)):
+        base, cases = render_dedup_cases(index, (meeting.width, meeting.height))
+        pairs += [(name, decoded(base), decoded(image)) for name, image in cases.items()]
+
+    def run():
+        skipped = []
+        for name, base, image in pairs:
+            deduplicator = SceneDeduplicator(cfg)
+            deduplicator.is_duplicate(base)
+            skipped.append((name, deduplicator.is_duplicate(image)))
+        return skipped
+
+    seconds, skipped = best_of(repeats, run)
+    return {
+        "pairs": len(pairs),
+        "ms_per_pair": seconds / len(pairs) * 1000,
+        **{
+            f"{name}_skipped": sum(1 for case, skip in skipped if case == name and skip)
+            for name in DEDUP_CASES
+        },
+        "lost_edits": sum(1 for name, skip in skipped if skip and not DEDUP_CASES[name]),
+        "extra_ocr": sum(1 for name, skip in skipped if not skip and DEDUP_CASES[name]),
+    }
+
+
+def bench_ocr(meeting: SyntheticMeeting, cfg: DictConfig, repeats: int) -> dict:
+    from mink.ocr import load_easyocr, process_ocr_easyocr
+
+    start = time.perf_counter()
+    reader = load_easyocr(cfg)
+    load_seconds = time.perf_counter() - start
+
+    stats, timings = {}, {}
+
+    def run():
+        stats.clear()
+        timings.clear()
+        return process_ocr_easyocr(meeting.path, "benchmark", cfg, reader, stats, None, timings)
+
+    seconds, events = best_of(repeats, run)
+    expected = {word.lower() for slide in meeting.slides for line in slide.lines for word in line.split()}
+    text_slides = sum(1 for slide in meeting.slides if slide.lines)
+    found = {word.lower() for event in events for word in event.content.split()}
+    return {
+        "seconds": seconds,
+        "model_load_seconds": load_seconds,
+        "realtime_factor": meeting.duration / seconds,
+        "events": len(events),
+        **stats,
+        **{f"{name}_seconds": value for name, value in timings.items()},
+        "word_recall": len(expected & found) / len(expected),
+        "expected_skip_ratio": 1 - text_slides / len(meeting.slides),
+    }
+
+
+def meeting_events(meeting: SyntheticMeeting, job_id: str, repeat: int = 1) -> tuple:
+    """
+    Transcript events for the utterances and one on-screen event per slide line,
+    repeated back to back `repeat` times.
+    """
+    from mink.models import TranscriptEvent, OnScreenEvent
+
+    transcript, ocr = [], []
+    for n in range(repeat):
+        offset = n * meeting.duration
+        transcript += [
+            TranscriptEvent(content=u.text, start=u.start + offset, end=u.end + offset, job_id=job_id)
+            for u in meeting.utterances
+        ]
+        ocr += [
+            OnScreenEvent(
+                content=line, start=slide.start + offset, end=slide.end + offset,
+                bbox=[60, 90 + 60 * i, 900, 130 + 60 * i], confidence=0.9, job_id=job_id,
+            )
+            for slide in meeting.slides
+            for i, line in enumerate(slide.lines)
+        ]
+    return transcript, ocr
+
+
+def bench_compose(meeting: SyntheticMeeting, cfg: DictConfig, repeats: int, hours: float) -> dict:
+    from mink.llmcast import compose_meeting_text, estimate_tokens
+
+    repeat = max(1, round(hours * 3600 / meeting.duration))
+    transcript, ocr = meeting_events(meeting, "benchmark", repeat)
+    compaction = cfg.cast.get("compaction") if cfg.get("cast") else None
+    results = {"meeting_hours": repeat * meeting.duration / 3600, "events": len(transcript) + len(ocr)}
+    for name, config in (("raw", None), ("compacted", compaction)):
+        if name == "compacted" and config is None:
+            continue
+        seconds, text = best_of(repeats, lambda: compose_meeting_text(transcript, ocr, config))
+        results[f"{name}_seconds"] = seconds
+        results[f"{name}_tokens"] = estimate_tokens(text)
+    return results
+
+
+def create_job_records(job_id: str):
+    from mink.db import get_session
+    from mink.models import Job, Meeting
+
+    with next(get_session()) as session:
+        meeting = Meeting(name=f"Meeting {job_id}", time_started=time.time())
+        session.add(meeting)
+        session.commit()
+        session.add(Job(job_id=job_id, job_status="started", meeting_id=meeting.id, time_started=time.time()))
+        session.commit()
+
+
+def bench_db(meeting: SyntheticMeeting, cfg: DictConfig, repeats: int, hours: float) -> dict:
+    from mink.db import init_db, close_db
+    from mink.main import save_partial_results
+
+    flush_events = int((cfg.get("workers") or {}).get("flush_events", 50))
+    repeat = max(1, round(hours * 3600 / meeting.duration))
+    init_db(cfg)
+    try:
+        batch_times = []
+
+        def run():
+            job_id = f"db-{len(batch_times)}"
+            create_job_records(job_id)
+            transcript, ocr = meeting_events(meeting, job_id, repeat)
+            events = transcript + ocr
+            for i in range(0, len(events), flush_events):
+                start = time.perf_counter()
+                save_partial_results(job_id, events[i:i + flush_events], events[i].start, None)
+                batch_times.append((time.perf_counter() - start) * 1000)
+            return len(events)
+
+        seconds, events = best_of(repeats, run)
+    finally:
+        asyncio.run(close_db())
+    return {
+        "seconds": seconds,
+        "events": events,
+        "batch_size": flush_events,
+        "events_per_second": events / seconds,
+        "batch_ms": percentiles(batch_times),
+    }
+
+
+class StubPool:
+    """
+    Stands in for a WorkerPool: reports the meeting's ground truth events in a few
+    batches instead of running a model.
+    """
+
+    def __init__(self, kind: str, meeting: SyntheticMeeting, batches: int = 4):
+        self.kind = kind
+        self.meeting = meeting
+        self.batches = batches
+
+    def submit(self, job_id: str, video_path: str, updates=None) -> Future:
+        future = Future()
+        threading.Thread(target=self._run, args=(job_id, future, updates), daemon=True).start()
+        return future
+
+    def _run(self, job_id: str, future: Future, updates):
+        transcript, ocr = meeting_events(self.meeting, job_id)
+        events = transcript if self.kind == "transcription" else ocr
+        size = max(1, -(-len(events) // self.batches))
+        for i in range(0, len(events), size):
+            batch = events[i:i + size]
+            if updates is not None:
+                updates.put((self.kind, batch, batch[-1].end, self.meeting.duration))
+        future.set_result((events, {}))
+
+    def shutdown(self):
+        pass
+
+
+def stub_cast(transcript_events, ocr_events, job_id, config, stats=None):
+    from mink.llmcast import compose_meeting_text
+    from mink.models import IntelligentNote
+
+    text = compose_meeting_text(transcript_events, ocr_events, config.get("compaction"))
+    return [
+        IntelligentNote(title=note_type.title, content=text[:200], job_id=job_id)
+        for note_type in config.types
+    ]
+
+
+def bench_api(meeting: SyntheticMeeting, cfg: DictConfig, jobs: int, concurrency: int) -> dict:
+    from fastapi.testclient import TestClient
+    import mink.main as server
+    from mink.workers import WORKER_KINDS
+
+    server.config_store["config"] = cfg
+    server.start_worker_pools = lambda config: {kind: StubPool(kind, meeting) for kind in WORKER_KINDS}
+    server.cast_to_intelligent_notes = stub_cast
+    headers = {"X-API-Key": API_KEY}
+    with open(meeting.path, "rb") as f:
+        video = f.read()
+
+    upload_times, job_times, job_seconds, statuses = [], [], [], []
+
+    def run_job(client: TestClient):
+        start = time.perf_counter()
+        response = client.post(
+            "/take-notes", files={"file": ("meeting.mp4", video)}, headers=headers
+        )
+        upload_times.append((time.perf_counter() - start) * 1000)
+        job_id = response.json()["job_id"]
+        while True:
+            status = client.get(f"/job/{job_id}/status", headers=headers).json()
+            if status["job_status"] in ("completed", "failed"):
+                break
+            time.sleep(0.05)
+        job_seconds.append(time.perf_counter() - start)
+        statuses.append(status["job_status"])
+
+        request_start = time.perf_counter()
+        client.get(f"/job/{job_id}", headers=headers).raise_for_status()
+        job_times.append((time.perf_counter() - request_start) * 1000)
+
+    with TestClient(server.app) as client:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            for future in [executor.submit(run_job, client) for _ in range(jobs)]:
+                future.result()
+        seconds = time.perf_counter() - start
+
+    return {
+        "seconds": seconds,
+        "jobs": jobs,
+        "concurrency": concurrency,
+        "completed": statuses.count("completed"),
+        "jobs_per_second": jobs / seconds,
+        "upload_mb": len(video) / 1e6,
+        "take_notes_ms": percentiles(upload_times),
+        "get_job_ms": percentiles(job_times),
+        "job_seconds": percentiles(job_seconds),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(CONFIG_DIR),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(previous: dict, current: dict):
+    before = flatten(previous["results"])
+    after = flatten(current["results"])
+    print(f"\n{'metric':<48}{'before':>14}{'after':>14}{'change':>10}")
+    for name, value in after.items():
+        if name not in before:
+            continue
+        change = f"{(value - before[name]) / before[name] * 100:+.1f}%" if before[name] else ""
+        print(f"{name:<48}{before[name]:>14.4g}{value:>14.4g}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("overrides", nargs="*", help="Config overrides, e.g. ocr.batch_size=8")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Results of an earlier run to compare with")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--no-audio", action="store_true", help="Generate the video without an audio track")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gallery-every", type=int, default=4, help="Make every Nth slide a gallery view")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per benchmark, the fastest is kept")
+    parser.add_argument("--hours", type=float, default=2.0, help="Meeting length for compose and db")
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs submitted by the api benchmark")
+    parser.add_argument("--concurrency", type=int, default=4, help="Clients of the api benchmark")
+    args = parser.parse_args()
+
+    cfg = load_config(args.overrides)
+    output = os.path.abspath(args.output)
+    workdir = tempfile.mkdtemp(prefix="mink-bench-")
+    # The SQLite fallback database is created in the working directory
+    os.chdir(workdir)
+
+    start = time.perf_counter()
+    meeting = make_meeting(
+        os.path.join(workdir, "meeting.mp4"), args.slides, (8.0, 30.0), args.fps,
+        (args.width, args.height), not args.no_audio, args.seed, args.gallery_every,
+    )
+    print(f"Generated a {meeting.duration:.0f}s meeting in {time.perf_counter() - start:.1f}s")
+
+    runs = {
+        "scene_detection": lambda: bench_scene_detection(meeting, cfg, args.repeats),
+        "text_filter": lambda: bench_text_filter(meeting, cfg, args.repeats),
+        "dedup": lambda: bench_dedup(meeting, cfg, args.repeats),
+        "ocr": lambda: bench_ocr(meeting, cfg, args.repeats),
+        "compose": lambda: bench_compose(meeting, cfg, args.repeats, args.hours),
+        "db": lambda: bench_db(meeting, cfg, args.repeats, args.hours),
+        "api": lambda: bench_api(meeting, cfg, args.jobs, args.concurrency),
+    }
+    results = {}
+    for name in args.only:
+        print(f"Running {name}")
+        results[name] = runs[name]()
+        print(json.dumps(results[name], indent=2))
+
+    report = {
+        "commit": git_commit(),
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": OmegaConf.to_container(cfg.ocr),
+        "overrides": args.overrides,
+        "meeting": {
+            "duration": meeting.duration, "fps": meeting.fps, "width": meeting.width,
+            "height": meeting.height, "slides": len(meeting.slides), "audio": meeting.has_audio,
+            "seed": args.seed, "gallery_every": args.gallery_every,
+        },
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Generates synthetic meeting recordings with a known ground truth: slides of
+rendered text that change at known times, camera-only gallery views without
+text in between, a moving cursor that must not count as a scene change, and a
+speech-like audio track with known utterances.
+
+    uv run python -m benchmarks.synthetic meeting.mp4 --slides 20 --fps 30 --gallery-every 4
+
+A JSON description of the meeting is written next to the video.
+"""
+import argparse
+import json
+import math
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+WORDS = (
+    "quarterly roadmap revenue pipeline hiring launch budget review customer churn "
+    "retention onboarding latency database migration release metrics dashboard design "
+    "feedback support pricing contract renewal security audit incident backlog sprint "
+    "forecast marketing campaign partner integration deadline milestone owner"
+).split()
+
+# Background and text colours (BGR), far enough apart for ContentDetector to cut on
+PALETTES = [
+    ((255, 255, 255), (20, 20, 20)),
+    ((40, 40, 40), (240, 240, 240)),
+    ((120, 60, 10), (255, 255, 255)),
+    ((210, 235, 250), (60, 30, 0)),
+    ((20, 90, 20), (230, 255, 230)),
+]
+
+
+@dataclass
+class Slide:
+    start: float
+    end: float
+    # No lines for a gallery view
+    lines: List[str]
+
+
+@dataclass
+class Utterance:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class SyntheticMeeting:
+    path: str
+    fps: float
+    width: int
+    height: int
+    duration: float
+    has_audio: bool
+    slides: List[Slide] = field(default_factory=list)
+    utterances: List[Utterance] = field(default_factory=list)
+
+    @property
+    def cuts(self) -> List[float]:
+        return [slide.start for slide in self.slides[1:]]
+
+    @property
+    def frame_count(self) -> int:
+        return round(self.duration * self.fps)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def plan_meeting(
+    path: str,
+    slides: int,
+    slide_seconds: Tuple[float, float],
+    fps: float,
+    size: Tuple[int, int],
+    audio: bool,
+    seed: int,
+    gallery_every: int = 0,
+) -> SyntheticMeeting:
+    """
+    Picks the slide texts, cut times and utterances. Cuts fall on frame boundaries.
+    Every gallery_every-th slide is a gallery view instead.
+    """
+    rng = random.Random(seed)
+    meeting = SyntheticMeeting(path, fps, size[0], size[1], 0.0, audio)
+    start = 0.0
+    for index in range(slides):
+        frames = round(rng.uniform(*slide_seconds) * fps)
+        end = start + frames / fps
+        if gallery_every and index % gallery_every == gallery_every - 1:
+            lines = []
+        else:
+            lines = [f"{index + 1}. {_sentence(rng, 3).title()}"]
+            lines += [f"- {_sentence(rng, rng.randint(3, 6))}" for _ in range(rng.randint(2, 5))]
+        meeting.slides.append(Slide(start, end, lines))
+        start = end
+    meeting.duration = start
+
+    # About 2.5 words a second, with pauses in between
+    t = rng.uniform(0.2, 1.0)
+    while t < meeting.duration - 1.0:
+        words = rng.randint(4, 16)
+        end = min(t + words / 2.5, meeting.duration)
+        meeting.utterances.append(Utterance(round(t, 3), round(end, 3), _sentence(rng, words)))
+        t = end + rng.uniform(0.4, 2.0)
+    return meeting
+
+
+def _draw_webcam(image: np.ndarray, box: Tuple[int, int, int, int], rng: np.random.Generator, shift: int = 0):
+    """
+    A head and shoulders in front of a wall with a few shelves, shifted sideways by shift pixels.
+    """
+    x, y, tile_width, tile_height = box
+    cv2.rectangle(
+        image, (x + 4, y + 4), (x + tile_width - 4, y + tile_height - 4),
+        rng.integers(40, 200, 3).tolist(), -1,
+    )
+    for _ in range(4):
+        shelf_x = x + int(rng.integers(8, tile_width - 40))
+        shelf_y = y + int(rng.integers(8, tile_height - 60))
+        cv2.rectangle(
+            image, (shelf_x, shelf_y),
+            (shelf_x + int(rng.integers(8, 30)), shelf_y + int(rng.integers(30, 60))),
+            rng.integers(0, 255, 3).tolist(), -1,
+        )
+    center_x, center_y = x + tile_width // 2 + shift, y + tile_height // 2
+    skin = (int(rng.integers(90, 160)), int(rng.integers(120, 190)), int(rng.integers(170, 230)))
+    cv2.ellipse(
+        image, (center_x, center_y - tile_height // 10), (tile_width // 8, tile_height // 5),
+        0, 0, 360, skin, -1,
+    )
+    cv2.ellipse(
+        image, (center_x, y + tile_height), (tile_width // 4, tile_height // 4),
+        0, 180, 360, rng.integers(0, 255, 3).tolist(), -1,
+    )
+
+
+def _blur_and_noise(image: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    image = cv2.GaussianBlur(image, (0, 0), 2)
+    noise = rng.normal(0, 6, image.shape)
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def render_gallery(index: int, size: Tuple[int, int]) -> np.ndarray:
+    """
+    A grid of webcam tiles, blurred and with sensor noise. There is no text on it.
+    """
+    rng = np.random.default_rng(index)
+    width, height = size
+    image = np.full((height, width, 3), 30, np.uint8)
+    columns = 2 + index % 2
+    tile_width, tile_height = width // columns, height // columns
+    for column in range(columns):
+        for row in range(columns):
+            _draw_webcam(image, (column * tile_width, row * tile_height, tile_width, tile_height), rng)
+    return _blur_and_noise(image, rng)
+
+
+def render_slide(slide: Slide, index: int, size: Tuple[int, int]) -> np.ndarray:
+    if not slide.lines:
+        return render_gallery(index, size)
+    width, height = size
+    background, ink = PALETTES[index % len(PALETTES)]
+    image = np.full((height, width, 3), background, np.uint8)
+    scale = width / 1280
+    y = int(90 * scale)
+    for number, line in enumerate(slide.lines):
+        title = number == 0
+        font_scale = (1.6 if title else 1.0) * scale
+        thickness = max(1, round((3 if title else 2) * scale))
+        cv2.putText(
+            image, line, (int(60 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+            font_scale, ink, thickness, cv2.LINE_AA,
+        )
+        y += int((110 if title else 60) * scale)
+    return image
+
+
+def draw_cursor(image: np.ndarray, t: float) -> np.ndarray:
+    """
+    A small arrow drifting over the slide, the kind of motion that isn't a scene change.
+    """
+    height, width = image.shape[:2]
+    x = int(width * (0.5 + 0.35 * math.sin(t * 0.7)))
+    y = int(height * (0.6 + 0.25 * math.cos(t * 0.5)))
+    tip = np.array([[x, y], [x, y + 18], [x + 5, y + 14], [x + 12, y + 14]], np.int32)
+    frame = image.copy()
+    cv2.fillPoly(frame, [tip], (0, 0, 255))
+    return frame
+
+
+# Changes between two frames of a slide, and whether OCR can skip the second frame
+DEDUP_CASES = {
+    "cursor": True,
+    "popup": True,
+    "webcam": True,
+    "bullet": False,
+    "word": False,
+    "number": False,
+}
+
+
+def render_dedup_cases(index: int, size: Tuple[int, int]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    A slide next to the presenter's webcam tile, and the same slide after each of
+    DEDUP_CASES: the cursor moved, a notification popup over the title, the presenter
+    moved, a bullet added, a word replaced and a figure changed. The webcam noise
+    differs in every frame.
+    """
+    rng = random.Random(index)
+    width, height = size
+    scale = width / 1280
+    lines = [f"{index + 1}. {_sentence(rng, 3).title()}"]
+    lines += [f"- {_sentence(rng, rng.randint(3, 5))}" for _ in range(2)]
+    lines.append(f"- {_sentence(rng, 2)} up 12%")
+    tile_width, tile_height = width // 4, height // 4
+    tile_x, tile_y = width - tile_width - int(16 * scale), height - tile_height - int(16 * scale)
+
+    def render(lines: List[str], noise: int, shift: int = 0, cursor: float = 0.0, popup: bool = False):
+        image = render_slide(Slide(0.0, 0.0, lines), index, size)
+        tile = np.full((tile_height, tile_width, 3), 30, np.uint8)
+        _draw_webcam(tile, (0, 0, tile_width, tile_height), np.random.default_rng(index), shift)
+        image[tile_y:tile_y + tile_height, tile_x:tile_x + tile_width] = _blur_and_noise(
+            tile, np.random.default_rng(noise)
+        )
+        if popup:
+            x0, y0 = width - int(400 * scale), int(20 * scale)
+            x1, y1 = width - int(20 * scale), int(110 * scale)
+            cv2.rectangle(image, (x0, y0), (x1, y1), (45, 45, 45), -1)
+            cv2.rectangle(image, (x0, y0), (x1, y1), (90, 90, 90), max(1, round(scale)))
+            for number, (text, font_scale) in enumerate(
+                (("New message", 0.7), ("Alex: are we still on for 3pm?", 0.6))
+            ):
+                cv2.putText(
+                    image, text, (x0 + int(16 * scale), y0 + int((35 + 35 * number) * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale * scale, (235, 235, 235),
+                    max(1, round(scale)), cv2.LINE_AA,
+                )
+        return draw_cursor(image, cursor)
+
+    words = lines[1].split()
+    words[2] = next(word for word in WORDS if word != words[2])
+    cases = {
+        "cursor": render(lines, 1, cursor=4.0),
+        "popup": render(lines, 2, popup=True),
+        "webcam": render(lines, 3, shift=tile_width // 8),
+        "bullet": render(lines + [f"- {_sentence(rng, 4)}"], 4),
+        "word": render([lines[0], " ".join(words)] + lines[2:], 5),
+        "number": render(lines[:-1] + [lines[-1].replace("12%", "13%")], 6),
+    }
+    return render(lines, 0), cases
+
+
+def synthesize_audio(meeting: SyntheticMeeting) -> np.ndarray:
+    """
+    Mono float32 samples: voiced, syllable-paced harmonic tones during utterances
+    and low noise between them, enough for voice activity detection to split on.
+    """
+    rng = np.random.default_rng(len(meeting.utterances))
+    samples = np.zeros(math.ceil(meeting.duration * SAMPLE_RATE), np.float32)
+    samples += rng.normal(0, 0.002, samples.shape).astype(np.float32)
+    for number, utterance in enumerate(meeting.utterances):
+        first = int(utterance.start * SAMPLE_RATE)
+        last = min(int(utterance.end * SAMPLE_RATE), len(samples))
+        t = np.arange(last - first) / SAMPLE_RATE
+        pitch = 110 + 40 * (number % 3) + 8 * np.sin(2 * np.pi * 0.8 * t)
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        voice = sum(np.sin(k * phase) / k for k in range(1, 9))
+        syllables = np.abs(np.sin(np.pi * 4 * t)) ** 0.5
+        samples[first:last] += (0.15 * voice * syllables).astype(np.float32)
+    return np.clip(samples, -1.0, 1.0)
+
+
+def _frames(meeting: SyntheticMeeting):
+    size = (meeting.width, meeting.height)
+    for index, slide in enumerate(meeting.slides):
+        image = render_slide(slide, index, size)
+        first = round(slide.start * meeting.fps)
+        last = round(slide.end * meeting.fps)
+        for frame_num in range(first, last):
+            yield draw_cursor(image, frame_num / meeting.fps)
+
+
+def _write_silent(meeting: SyntheticMeeting):
+    writer = cv2.VideoWriter(
+        meeting.path, cv2.VideoWriter_fourcc(*"mp4v"), meeting.fps, (meeting.width, meeting.height)
+    )
+    try:
+        for frame in _frames(meeting):
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def _write_with_audio(meeting: SyntheticMeeting):
+    # PyAV comes with faster-whisper, which decodes the audio with it
+    import av
+
+    samples = synthesize_audio(meeting)
+    with av.open(meeting.path, "w") as container:
+        video = container.add_stream("mpeg4", rate=round(meeting.fps))
+        video.codec_context.width = meeting.width
+        video.codec_context.height = meeting.height
+        video.codec_context.pix_fmt = "yuv420p"
+        # The default bitrate blurs small text
+        video.codec_context.bit_rate = 4_000_000
+        audio = container.add_stream("aac", rate=SAMPLE_RATE)
+        audio.codec_context.layout = "mono"
+        chunk = audio.codec_context.frame_size or 1024
+
+        audio_pos = 0
+
+        def write_audio(until: int):
+            nonlocal audio_pos
+            while audio_pos < until:
+                block = samples[audio_pos:audio_pos + chunk]
+                if len(block) < chunk:
+                    block = np.pad(block, (0, chunk - len(block)))
+                frame = av.AudioFrame.from_ndarray(block[np.newaxis, :], format="fltp", layout="mono")
+                frame.sample_rate = SAMPLE_RATE
+                frame.pts = audio_pos
+                container.mux(audio.encode(frame))
+                audio_pos += chunk
+
+        for frame_num, image in enumerate(_frames(meeting)):
+            container.mux(video.encode(av.VideoFrame.from_ndarray(image, format="bgr24")))
+            write_audio(int((frame_num + 1) / meeting.fps * SAMPLE_RATE))
+        write_audio(len(samples))
+        container.mux(video.encode(None))
+        container.mux(audio.encode(None))
+
+
+def make_meeting(
+    path: str,
+    slides: int = 20,
+    slide_seconds: Tuple[float, float] = (8.0, 30.0),
+    fps: float = 30,
+    size: Tuple[int, int] = (1280, 720),
+    audio: bool = True,
+    seed: int = 0,
+    gallery_every: int = 0,
+) -> SyntheticMeeting:
+    """
+    Writes a synthetic meeting video to path and returns its ground truth. Without
+    audio the video is written by OpenCV alone; with it PyAV is needed.
+    """
+    meeting = plan_meeting(path, slides, slide_seconds, fps, size, audio, seed, gallery_every)
+    if audio:
+        _write_with_audio(meeting)
+    else:
+        _write_silent(meeting)
+    return meeting
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Video file to write, e.g. meeting.mp4")
+    parser.add_argument("--slides", type=int, default=20)
+    parser.add_argument("--min-slide-seconds", type=float, default=8.0)
+    parser.add_argument("--max-slide-seconds", type=float, default=30.0)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--no-audio", action="store_true", help="Write the video without an audio track")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gallery-every", type=int, default=0, help="Make every Nth slide a gallery view")
+    args = parser.parse_args()
+
+    meeting = make_meeting(
+        args.path,
+        args.slides,
+        (args.min_slide_seconds, args.max_slide_seconds),
+        args.fps,
+        (args.width, args.height),
+        not args.no_audio,
+        args.seed,
+        args.gallery_every,
+    )
+    with open(f"{args.path}.json", "w") as f:
+        json.dump(meeting.to_dict(), f, indent=2)
+    print(
+        f"Wrote {meeting.duration:.0f}s with {len(meeting.slides)} slides and "
+        f"{len(meeting.utterances)} utterances to {args.path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
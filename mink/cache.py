@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+from typing import List, Optional, Tuple
+from omegaconf import DictConfig, OmegaConf
+from sqlmodel import Session, select
+from .devices import get_device_settings
+from .models import Job, TranscriptEvent, OnScreenEvent
+
+logger = logging.getLogger(__name__)
+
+
+# Config values that change how fast results are produced, not the results
+CACHE_KEY_IGNORED = (
+    "ocr.batch_size",
+    "transcript.batch_size",
+    "transcript.cpu.batch_size",
+    "transcript.cpu.cpu_threads",
+    "transcript.cpu.num_workers",
+    "transcript.parallel.cpu_threads",
+)
+
+
+def _config_block(config: DictConfig, name: str) -> dict:
+    """
+    The resolved config block without the keys in CACHE_KEY_IGNORED.
+    """
+    block = OmegaConf.to_container(config.get(name) or {}, resolve=True)
+    for path in CACHE_KEY_IGNORED:
+        section, *parents, key = path.split(".")
+        if section != name:
+            continue
+        node = block
+        for parent in parents:
+            node = node.get(parent) if isinstance(node, dict) else None
+        if isinstance(node, dict):
+            node.pop(key, None)
+    return block
+
+
+def result_cache_key(content_hash: Optional[str], config: DictConfig) -> Optional[str]:
+    """
+    Key of the transcription/OCR results for a file. It covers the whole transcript
+    and ocr config, apart from CACHE_KEY_IGNORED, so changing anything else there
+    invalidates old entries.
+    """
+    if not content_hash:
+        return None
+
+    key = {
+        "content_hash": content_hash,
+        "transcript": _config_block(config, "transcript"),
+        # The precision that is actually used depends on the device
+        "precision": get_device_settings(config)["precision"],
+        "ocr": _config_block(config, "ocr"),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def is_cache_enabled(config: DictConfig) -> bool:
+    cache_cfg = config.get("cache") or {}
+    return bool(cache_cfg.get("enabled", True))
+
+
+def load_cached_results(
+    session: Session, cache_key: str, job_id: str
+) -> Optional[Tuple[List[TranscriptEvent], List[OnScreenEvent]]]:
+    """
+    Finds a completed job with the same cache key and copies its events for job_id.
+    Jobs whose transcription or OCR failed have no cache key. Returns None on a cache miss.
+    """
+    source = session.exec(
+        select(Job)
+        .where(Job.cache_key == cache_key)
+        .where(Job.job_status == "completed")
+        .where(Job.job_id != job_id)
+        .order_by(Job.time_started.desc())
+    ).first()
+    if source is None or not source.transcript_events:
+        return None
+
+    logger.info(f"Job {job_id}: Reusing results of job {source.job_id}")
+    transcript = [
+        TranscriptEvent(**event.model_dump(exclude={"id", "job_id"}), job_id=job_id)
+        for event in source.transcript_events
+    ]
+    ocr = [
+        OnScreenEvent(**event.model_dump(exclude={"id", "job_id"}), job_id=job_id)
+        for event in source.ocr_events
+    ]
+    transcript.sort(key=lambda event: event.start)
+    ocr.sort(key=lambda event: event.start)
+    return transcript, ocr
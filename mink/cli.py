@@ -40,6 +40,14 @@ def main():
 
     # Command-specific arguments
     submit.add_argument("video_path", help="Path to the video file")
+    submit.add_argument(
+        "--resumable",
+        action="store_true",
+        help="Upload in chunks that are resumed after a dropped connection",
+    )
+    submit.add_argument(
+        "--chunk-size", type=int, default=8, help="Chunk size in MB for --resumable"
+    )
     job.add_argument("job_id", help="Job ID to query")
     meeting.add_argument("meeting_id", help="Meeting ID to query")
 
@@ -89,6 +97,51 @@ def visualize_response(response: dict):
         console.print(ocr_str)
 
 
+def upload_resumable(args, headers: dict, max_retries: int = 5) -> requests.Response:
+    """
+    Uploads the video in chunks. After a dropped connection, asks the server how much
+    it received and continues from there. Returns the response of the completed upload.
+    """
+    size = os.path.getsize(args.video_path)
+    chunk_size = args.chunk_size * 1024 * 1024
+    response = requests.post(
+        f"{args.url}/uploads",
+        headers=headers,
+        params={"filename": os.path.basename(args.video_path), "size": size},
+    )
+    if response.status_code != 200:
+        return response
+    upload_id = response.json()["upload_id"]
+    upload_url = f"{args.url}/uploads/{upload_id}"
+
+    offset = 0
+    retries = 0
+    with console.status(f"Sending '{args.video_path}' to {upload_url}...") as status:
+        with open(args.video_path, "rb") as f:
+            while offset < size:
+                f.seek(offset)
+                chunk = f.read(chunk_size)
+                try:
+                    response = requests.patch(
+                        upload_url,
+                        headers={**headers, "Upload-Offset": str(offset)},
+                        data=chunk,
+                    )
+                except requests.exceptions.ConnectionError:
+                    retries += 1
+                    if retries > max_retries:
+                        raise
+                    # The next attempt is answered with a 409 carrying the server's offset
+                    time.sleep(2**retries)
+                    continue
+                if response.status_code not in (200, 409):
+                    return response
+                offset = response.json()["offset"]
+                status.update(f"Sending '{args.video_path}' ({offset * 100 // max(size, 1)}%)...")
+
+    return requests.post(f"{upload_url}/complete", headers=headers)
+
+
 def submit_video(args):
     if not os.path.exists(args.video_path):
         console.print(f"Error: File '{args.video_path}' not found.")
@@ -96,13 +149,20 @@ def submit_video(args):
 
     headers = {"X-API-Key": args.api_key}
     try:
-        with console.status(f"Sending '{args.video_path}' to {args.url}/take-notes..."):
-            with open(args.video_path, "rb") as f:
-                files = {"file": f}
-                response = requests.post(
-                    f"{args.url}/take-notes", headers=headers, files=files
-                )
+        if args.resumable:
+            response = upload_resumable(args, headers)
+        else:
+            with console.status(f"Sending '{args.video_path}' to {args.url}/take-notes..."):
+                with open(args.video_path, "rb") as f:
+                    files = {"file": f}
+                    response = requests.post(
+                        f"{args.url}/take-notes", headers=headers, files=files
+                    )
 
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "a few")
+            console.print(f"[red]Server is busy. Try again in {retry_after} seconds.")
+            sys.exit(1)
         if response.status_code != 200:
             console.print(f"Error: {response.status_code}")
             console.print(response.text)
@@ -115,10 +175,10 @@ def submit_video(args):
         console.print(f"Created new meeting (meeting id: [cyan]{job['meeting_id']}[/cyan])")
         console.print(f"Status: [green]{current_job_status}")
 
-        with console.status("Waiting for job to complete..."):
+        with console.status("Waiting for job to complete...") as status:
             while current_job_status != "completed" and current_job_status != "failed":
                 time.sleep(1)
-                response = requests.get(f"{args.url}/job/{job_id}", headers=headers)
+                response = requests.get(f"{args.url}/job/{job_id}/status", headers=headers)
                 if response.status_code != 200:
                     console.print(f"Error: {response.status_code}")
                     console.print(response.text)
@@ -128,8 +188,14 @@ def submit_video(args):
                 if current_job_status != job["job_status"]:
                     console.print(f"Status: [green]{job['job_status']}")
                     current_job_status = job["job_status"]
+                if job.get("duration") and job.get("processed_seconds") is not None:
+                    status.update(
+                        f"Waiting for job to complete... "
+                        f"({job['processed_seconds']:.0f}s / {job['duration']:.0f}s processed)"
+                    )
 
         if current_job_status == "completed":
+            response = requests.get(f"{args.url}/job/{job_id}", headers=headers)
             try:
                 json_response = response.json()
                 visualize_response(json_response)
@@ -202,9 +268,9 @@ def get_meeting(args):
             job["job_id"],
             job["job_status"],
             time_started_str,
-            str(len(job.get("transcript_events", []))),
-            str(len(job.get("ocr_events", []))),
-            str(len(job.get("intelligent_notes", []))),
+            str(job.get("transcript_event_count", 0)),
+            str(job.get("ocr_event_count", 0)),
+            str(job.get("intelligent_note_count", 0)),
         )    
     layout["jobs"].update(jobs_table)
     console.print(layout)
@@ -1,11 +1,26 @@
-from typing import Generator
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Generator, List, Sequence, Type
+from sqlalchemy import inspect, insert, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from omegaconf import DictConfig
 import logging
 
 
 logger = logging.getLogger(__name__)
+# Used by the job threads
 engine = None
+# Used by the HTTP handlers, so a slow query doesn't block the event loop
+async_engine = None
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+DEFAULT_INSERT_BATCH_SIZE = 1000
+insert_batch_size = DEFAULT_INSERT_BATCH_SIZE
 
 
 def get_db_url(cfg: DictConfig) -> str:
@@ -24,19 +39,211 @@ def get_db_url(cfg: DictConfig) -> str:
     return f"postgresql://{user}:{password}@{host}:{port}/{name}"
 
 
+def add_missing_indexes(engine):
+    """
+    Like add_missing_columns, for indexes declared after their table was created.
+    PostgreSQL builds them CONCURRENTLY so the tables stay writable meanwhile.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    concurrently = "CONCURRENTLY " if engine.dialect.name == "postgresql" else ""
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                columns = ", ".join(quote(column.name) for column in index.columns)
+                logger.info(f"Creating index {index.name} on {table.name} ({columns})")
+                start = time.perf_counter()
+                conn.execute(
+                    text(
+                        f"CREATE INDEX {concurrently}IF NOT EXISTS {quote(index.name)} "
+                        f"ON {quote(table.name)} ({columns})"
+                    )
+                )
+                logger.info(f"Created index {index.name} in {time.perf_counter() - start:.1f}s")
+
+
+def get_async_db_url(url: str) -> str:
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(
+        hide_password=False
+    )
+
+
+def get_pool_settings(cfg: DictConfig) -> dict:
+    """
+    Connection pool arguments of create_engine from the db config. Unset values
+    keep the SQLAlchemy defaults.
+    """
+    db_cfg = cfg.get("db") or {}
+    settings = {}
+    for key, cast in (
+        ("pool_size", int),
+        ("max_overflow", int),
+        ("pool_timeout", float),
+        ("pool_recycle", int),
+        ("pool_pre_ping", bool),
+    ):
+        if db_cfg.get(key) is not None:
+            settings[key] = cast(db_cfg.get(key))
+    return settings
+
+
+class CheckoutStats:
+    """
+    How long sessions waited for a pooled connection. A growing wait means the
+    pool is too small for the request rate.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        with self.lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": avg_wait * 1000,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+checkout_stats = {"jobs": CheckoutStats(), "api": CheckoutStats()}
+
+
+def pool_status() -> dict:
+    """
+    Size, usage and checkout waits of both connection pools.
+    """
+    status = {}
+    for name, pool in (
+        ("jobs", engine.pool if engine is not None else None),
+        ("api", async_engine.pool if async_engine is not None else None),
+    ):
+        status[name] = {
+            # Pools without a fixed size (e.g. NullPool) don't report these
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            **checkout_stats[name].to_dict(),
+        }
+    return status
+
+
 def init_db(cfg: DictConfig):
-    global engine
+    global engine, async_engine, insert_batch_size
 
+    db_cfg = cfg.get("db") or {}
+    insert_batch_size = int(db_cfg.get("insert_batch_size", DEFAULT_INSERT_BATCH_SIZE))
+    pool_settings = get_pool_settings(cfg)
     url = get_db_url(cfg)
-    logger.info(f"Connecting to database at {url}")
-    engine = create_engine(url)
+    logger.info(f"Connecting to database at {url} with pool settings {pool_settings}")
+    engine = create_engine(url, **pool_settings)
+    async_engine = create_async_engine(get_async_db_url(url), **pool_settings)
     logger.info("Creating tables in database")
     SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
     logger.info(f"Database initialized at {url}")
 
 
+def add_missing_columns(engine):
+    """
+    create_all only creates missing tables, so columns added to a model after its
+    table was created are added here. New columns are always nullable.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info(f"Adding column {table.name}.{column.name} ({column_type})")
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                    )
+                )
+
+
+def bulk_insert(
+    session: Session, rows: Sequence[SQLModel], batch_size: int = 0
+) -> float:
+    """
+    Inserts model instances with one executemany INSERT per table and batch instead
+    of flushing every object through the ORM. The instances are not attached to the
+    session and don't get their ids. Returns the seconds spent.
+    """
+    batch_size = batch_size or insert_batch_size
+    by_model: Dict[Type[SQLModel], List[dict]] = {}
+    for row in rows:
+        by_model.setdefault(type(row), []).append(row.model_dump(exclude={"id"}))
+
+    start = time.perf_counter()
+    for model, values in by_model.items():
+        for i in range(0, len(values), batch_size):
+            session.execute(insert(model), values[i : i + batch_size])
+    elapsed = time.perf_counter() - start
+    if rows:
+        counts = ", ".join(f"{len(v)} {m.__name__}" for m, v in by_model.items())
+        logger.info(f"Inserted {counts} in {elapsed * 1000:.1f}ms")
+    return elapsed
+
+
+async def close_db():
+    if async_engine is not None:
+        await async_engine.dispose()
+    if engine is not None:
+        engine.dispose()
+
+
 def get_session() -> Generator[Session, None, None]:
     if engine is None:
         raise RuntimeError("Database engine not initialized")
     with Session(engine) as session:
+        start = time.perf_counter()
+        session.connection()
+        checkout_stats["jobs"].record(time.perf_counter() - start)
+        yield session
+
+
+@asynccontextmanager
+async def async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session of the async engine. Objects stay readable after commit, since
+    expired attributes can't be lazily reloaded in async code.
+    """
+    if async_engine is None:
+        raise RuntimeError("Database engine not initialized")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        start = time.perf_counter()
+        await session.connection()
+        checkout_stats["api"].record(time.perf_counter() - start)
+        yield session
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency version of async_session.
+    """
+    async with async_session() as session:
         yield session
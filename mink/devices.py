@@ -0,0 +1,46 @@
+import functools
+from omegaconf import DictConfig
+
+# Device selection for transcription. It lives apart from transcription.py so the
+# API process can use it, e.g. for cache keys, without importing faster-whisper.
+
+
+@functools.lru_cache(maxsize=None)
+def cuda_device_count() -> int:
+    """
+    CUDA devices CTranslate2 can use, counted once per process.
+    """
+    import ctranslate2
+
+    return ctranslate2.get_cuda_device_count()
+
+
+def resolve_device(config: DictConfig) -> str:
+    device = config.transcript.get("device", "auto")
+    if device == "auto":
+        return "cuda" if cuda_device_count() > 0 else "cpu"
+    return device
+
+
+def get_device_settings(config: DictConfig) -> dict:
+    """
+    Model and inference settings for the device transcription runs on. The top-level
+    transcript values apply to CUDA, the transcript.cpu block to CPU.
+    """
+    device = resolve_device(config)
+    if device == "cpu":
+        cpu_cfg = config.transcript.get("cpu") or {}
+        return {
+            "device": "cpu",
+            "precision": cpu_cfg.get("precision", "int8"),
+            "batch_size": int(cpu_cfg.get("batch_size", 4)),
+            "cpu_threads": int(cpu_cfg.get("cpu_threads") or 0),
+            "num_workers": int(cpu_cfg.get("num_workers", 1)),
+        }
+    return {
+        "device": device,
+        "precision": config.transcript.precision,
+        "batch_size": int(config.transcript.batch_size),
+        "cpu_threads": 0,
+        "num_workers": 1,
+    }
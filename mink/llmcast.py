@@ -1,14 +1,62 @@
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from difflib import SequenceMatcher
 from anthropic import Anthropic
+from anthropic.types import Usage
 from omegaconf import DictConfig
-from typing import List
+from typing import List, Optional, Tuple
 from .models import TranscriptEvent, OnScreenEvent, IntelligentNote
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rough size of a token in English text, good enough to budget chunks
+CHARS_PER_TOKEN = 4
+# Shortest prompt the API caches, for Sonnet and Opus models
+DEFAULT_MIN_CACHE_TOKENS = 1024
+
+
+def _in_time_order(events: list) -> list:
+    if all(a.start <= b.start for a, b in zip(events, events[1:])):
+        return events
+    return sorted(events, key=lambda x: x.start)
+
+
+def compose_meeting_lines(
+    transcript_events: List[TranscriptEvent],
+    ocr_events: List[OnScreenEvent],
+    compaction: Optional[DictConfig] = None,
+) -> List[str]:
+    """
+    One line of text per transcript or ocr event, in time order. Both lists are
+    usually already in time order, so they are merged instead of sorted.
+    With compaction, repeated events are merged first (see compact_events).
+    """
+    merged_events = heapq.merge(
+        ((event.start, "Transcript", event) for event in _in_time_order(transcript_events)),
+        ((event.start, "On-Screen", event) for event in _in_time_order(ocr_events)),
+        key=lambda item: item[0],
+    )
+    entries = [
+        [event_type, event.start, event.end, event.content, getattr(event, "confidence", 1.0)]
+        for _, event_type, event in merged_events
+    ]
+    if compaction is not None and compaction.get("enabled", True):
+        entries = compact_events(entries, compaction)
+
+    return [
+        f"[{event_type} | {start:.0f} - {end:.0f}]: {content}\n"
+        for event_type, start, end, content, _ in entries
+    ]
+
 
 def compose_meeting_text(
-    transcript_events: List[TranscriptEvent], ocr_events: List[OnScreenEvent]
+    transcript_events: List[TranscriptEvent],
+    ocr_events: List[OnScreenEvent],
+    compaction: Optional[DictConfig] = None,
 ) -> str:
     """
     Composes a full meeting text from transcript and ocr events from the meeting.
@@ -16,19 +64,123 @@ def compose_meeting_text(
     Args:
         transcript_events: List of transcript events
         ocr_events: List of ocr events
+        compaction: Optional compaction config, see compact_events
 
     Returns:
         str: Full meeting text
     """
-    merged_events = sorted(transcript_events + ocr_events, key=lambda x: x.start)
+    return "".join(compose_meeting_lines(transcript_events, ocr_events, compaction))
 
-    text = ""
-    for event in merged_events:
-        event_type = "Transcript" if isinstance(event, TranscriptEvent) else "On-Screen"
-        text += (
-            f"[{event_type} | {event.start:.0f} - {event.end:.0f}]: {event.content}\n"
-        )
-    return text
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def compact_events(entries: List[list], config: DictConfig) -> List[list]:
+    """
+    Shrinks the merged [type, start, end, content, confidence] entries in one pass:
+    - on-screen text below config.min_ocr_confidence is dropped
+    - on-screen text repeating one seen in the last config.ocr_window seconds, exactly
+      or with a similarity of at least config.ocr_similarity, extends the earlier entry
+    - consecutive transcript segments less than config.merge_gap seconds apart are
+      joined, up to config.max_merged_chars
+    """
+    min_confidence = float(config.get("min_ocr_confidence", 0.3))
+    window = float(config.get("ocr_window", 120))
+    similarity = float(config.get("ocr_similarity", 0.9))
+    merge_gap = float(config.get("merge_gap", 1.0))
+    max_chars = int(config.get("max_merged_chars", 600))
+
+    compacted = []
+    # Normalized on-screen text -> its entry, for texts seen within the window
+    recent_ocr = {}
+    recent_order = deque()
+    for entry in entries:
+        event_type, start, end, content, confidence = entry
+        if event_type == "On-Screen":
+            if confidence < min_confidence:
+                continue
+            while recent_order and recent_order[0][2] < start - window:
+                recent_ocr.pop(_normalize(recent_order.popleft()[3]), None)
+            text = _normalize(content)
+            seen = recent_ocr.get(text)
+            # Fuzzy matching is only worth it for longer texts like sentences and titles
+            if seen is None and len(text) >= 20:
+                for other, other_entry in recent_ocr.items():
+                    if abs(len(other) - len(text)) > len(text) * (1 - similarity):
+                        continue
+                    if SequenceMatcher(None, text, other).ratio() >= similarity:
+                        seen = other_entry
+                        break
+            if seen is not None:
+                seen[2] = max(seen[2], end)
+                continue
+            entry = list(entry)
+            recent_ocr[text] = entry
+            recent_order.append(entry)
+        else:
+            last = compacted[-1] if compacted else None
+            if (
+                last is not None
+                and last[0] == "Transcript"
+                and start - last[2] <= merge_gap
+                and len(last[3]) + len(content) <= max_chars
+            ):
+                last[2] = max(last[2], end)
+                last[3] = f"{last[3].rstrip()} {content.strip()}"
+                continue
+            entry = list(entry)
+        compacted.append(entry)
+    return compacted
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_meeting_lines(lines: List[str], max_tokens: int) -> List[str]:
+    """
+    Splits the meeting into consecutive time ranges of at most max_tokens each.
+    Chunks only break between events, so a line longer than the budget gets a chunk of its own.
+    """
+    chunks = []
+    chunk = []
+    chunk_tokens = 0
+    for line in lines:
+        tokens = estimate_tokens(line)
+        if chunk and chunk_tokens + tokens > max_tokens:
+            chunks.append("".join(chunk))
+            chunk = []
+            chunk_tokens = 0
+        chunk.append(line)
+        chunk_tokens += tokens
+    if chunk or not chunks:
+        chunks.append("".join(chunk))
+    return chunks
+
+
+# Token counts summed into the job stats, by Usage field
+USAGE_STATS = {
+    "input_tokens": "llm_input_tokens",
+    "output_tokens": "llm_output_tokens",
+    "cache_creation_input_tokens": "llm_cache_write_tokens",
+    "cache_read_input_tokens": "llm_cache_read_tokens",
+}
+
+MEETING_PREAMBLE = (
+    "The following is a transcript of a recorded meeting combined with on-screen text."
+)
+PART_PREAMBLE = (
+    "The following is part {part} of {parts} of a transcript of a recorded meeting "
+    "combined with on-screen text."
+)
+REDUCE_PREAMBLE = (
+    "The following are notes taken separately on consecutive parts of one recorded meeting."
+)
+DEFAULT_REDUCE_PROMPT = (
+    "Merge the notes above into one answer for the whole meeting, without repeating "
+    "anything, for this request: {prompt}"
+)
 
 
 def cast_to_intelligent_notes(
@@ -36,39 +188,207 @@ def cast_to_intelligent_notes(
     ocr_events: List[OnScreenEvent],
     job_id: str,
     config: DictConfig,
+    stats: Optional[dict] = None,
 ) -> List[IntelligentNote]:
     """
     Casts the meeting text to intelligent notes using the given config.
+    Note types are requested concurrently, with at most config.concurrency requests
+    in flight across all of them. A note type that still fails after its retries is skipped.
+
+    The meeting text is sent first, as a cached system prompt, and each note type's
+    prompt follows it. With config.prompt_cache, the note type with the smallest
+    max_tokens is requested first to write the cache, and the others read it. Meetings
+    shorter than config.prompt_cache_min_tokens can't be cached and skip that.
+
+    A meeting longer than a note type's chunk_tokens is cast in chunks, at most
+    fan_out at a time, and the partial notes are merged by a final request.
 
     Args:
         config: LLM config
         transcript_events: List of transcript events
         ocr_events: List of ocr events
+        stats: Receives the token counts, including cache reads and writes
 
     Returns:
-        Dict[str, str]: Intelligent notes for each type
+        List[IntelligentNote]: Intelligent notes in the order of config.types
     """
-    client = Anthropic(api_key=config.api_key)
-    meeting_text = compose_meeting_text(transcript_events, ocr_events)
+    client = Anthropic(
+        api_key=config.api_key,
+        base_url=config.get("base_url") or None,
+        max_retries=int(config.get("max_retries", 2)),
+        timeout=float(config.get("timeout", 120)),
+    )
+    compaction = config.get("compaction")
+    lines = compose_meeting_lines(transcript_events, ocr_events, compaction)
+    meeting_tokens = estimate_tokens("".join(lines))
+    if compaction is not None and compaction.get("enabled", True):
+        raw_tokens = estimate_tokens(compose_meeting_text(transcript_events, ocr_events))
+        logger.info(
+            f"Compaction reduced the meeting text from about {raw_tokens} to {meeting_tokens} "
+            f"tokens ({1 - meeting_tokens / raw_tokens:.0%} less)"
+        )
+        if stats is not None:
+            stats["meeting_tokens_raw"] = raw_tokens
+    if stats is not None:
+        stats["meeting_tokens"] = meeting_tokens
+    min_cache_tokens = int(config.get("prompt_cache_min_tokens") or DEFAULT_MIN_CACHE_TOKENS)
+    prompt_cache = bool(config.get("prompt_cache", True)) and meeting_tokens >= min_cache_tokens
+
+    note_types = list(config.types)
+    chunks = []
+    for note_type in note_types:
+        chunk_tokens = int(note_type.get("chunk_tokens") or config.get("chunk_tokens") or 0)
+        if chunk_tokens and meeting_tokens > chunk_tokens:
+            chunks.append(chunk_meeting_lines(lines, chunk_tokens))
+            logger.info(
+                f"Meeting has about {meeting_tokens} tokens, casting {note_type.title} "
+                f"in {len(chunks[-1])} chunks"
+            )
+        else:
+            chunks.append(["".join(lines)])
+
+    concurrency = int(config.get("concurrency") or len(note_types) or 1)
+    logger.info(
+        f"Casting to intelligent notes for {len(note_types)} types, {concurrency} requests at a time."
+    )
+    # Shared by the single, map and reduce requests of every note type
+    limit = threading.BoundedSemaphore(concurrency)
+
+    # A cache entry can only be read once the request writing it got its response
+    first = None
+    single = [i for i in range(len(note_types)) if len(chunks[i]) == 1]
+    if prompt_cache and len(single) > 1:
+        first = min(single, key=lambda i: note_types[i].max_tokens)
+
+    results = {}
+    # One thread per note type, which only holds a slot of limit while a request is in flight
+    with ThreadPoolExecutor(max_workers=max(1, len(note_types))) as executor:
+        if first is not None:
+            results[first] = executor.submit(
+                cast_note, client, note_types[first], chunks[first], job_id, config, limit, prompt_cache
+            )
+            wait([results[first]])
+        for i, note_type in enumerate(note_types):
+            if i not in results:
+                results[i] = executor.submit(
+                    cast_note, client, note_type, chunks[i], job_id, config, limit, prompt_cache
+                )
+
     intelligent_notes = []
-    logger.info(f"Casting to intelligent notes for {len(config.types)} types.")
-    for note_type in config.types:
-        prompt = note_type.prompt
-        max_tokens = note_type.max_tokens
-        full_prompt = f"{prompt}\n\n{meeting_text}"
-        anthropic_response = client.messages.create(
+    errors = []
+    for i, note_type in enumerate(note_types):
+        try:
+            note, usages = results[i].result()
+        except Exception as e:
+            logger.error(f"Casting {note_type.title} failed: {e}")
+            errors.append(e)
+            continue
+        intelligent_notes.append(note)
+        if stats is not None:
+            for usage in usages:
+                for field, key in USAGE_STATS.items():
+                    stats[key] = stats.get(key, 0) + (getattr(usage, field, None) or 0)
+    if errors and not intelligent_notes:
+        raise errors[0]
+    if stats is not None:
+        logger.info(
+            f"Cast used {stats.get('llm_input_tokens', 0)} uncached input tokens, "
+            f"{stats.get('llm_cache_write_tokens', 0)} cache write tokens and "
+            f"{stats.get('llm_cache_read_tokens', 0)} cache read tokens"
+        )
+    return intelligent_notes
+
+
+def cast_note(
+    client: Anthropic,
+    note_type: DictConfig,
+    chunks: List[str],
+    job_id: str,
+    config: DictConfig,
+    limit: threading.Semaphore,
+    prompt_cache: bool = False,
+) -> Tuple[IntelligentNote, List[Usage]]:
+    """
+    Casts a single note type, in one request or by map-reduce over the chunks.
+    Every request holds a slot of limit while in flight. Only the whole meeting,
+    shared by the note types, is marked for caching: chunks and partial notes are
+    sent once. Returns the note and the token usage of every request.
+    """
+    start = time.perf_counter()
+    if len(chunks) == 1:
+        content, usage = request_note(
+            client, note_type, f"{MEETING_PREAMBLE}\n\n{chunks[0]}", note_type.prompt, config,
+            limit, prompt_cache,
+        )
+        usages = [usage]
+    else:
+        fan_out = int(note_type.get("fan_out") or config.get("fan_out") or 4)
+        with ThreadPoolExecutor(max_workers=fan_out) as executor:
+            futures = [
+                executor.submit(
+                    request_note,
+                    client,
+                    note_type,
+                    PART_PREAMBLE.format(part=i + 1, parts=len(chunks)) + f"\n\n{chunk}",
+                    note_type.prompt,
+                    config,
+                    limit,
+                )
+                for i, chunk in enumerate(chunks)
+            ]
+        partials = [future.result() for future in futures]
+        usages = [usage for _, usage in partials]
+
+        notes = "\n\n".join(
+            f"[Part {i + 1} of {len(partials)}]\n{partial}"
+            for i, (partial, _) in enumerate(partials)
+        )
+        reduce_prompt = note_type.get("reduce_prompt") or DEFAULT_REDUCE_PROMPT.format(
+            prompt=note_type.prompt
+        )
+        content, usage = request_note(
+            client, note_type, f"{REDUCE_PREAMBLE}\n\n{notes}", reduce_prompt, config, limit
+        )
+        usages.append(usage)
+
+    logger.info(
+        f"Casted to intelligent notes for {note_type.title} in {time.perf_counter() - start:.1f}s"
+    )
+    note = IntelligentNote(title=note_type.title, content=content, job_id=job_id)
+    return note, usages
+
+
+def request_note(
+    client: Anthropic,
+    note_type: DictConfig,
+    system_text: str,
+    prompt: str,
+    config: DictConfig,
+    limit: threading.Semaphore,
+    cache: bool = False,
+) -> Tuple[str, Usage]:
+    """
+    Sends one request with system_text as the system prompt, cached if cache is set,
+    once a slot of limit is free. A note type can override the client's max_retries
+    and timeout.
+    """
+    options = {}
+    if note_type.get("max_retries") is not None:
+        options["max_retries"] = int(note_type.max_retries)
+    if note_type.get("timeout") is not None:
+        options["timeout"] = float(note_type.timeout)
+
+    system = [{"type": "text", "text": system_text}]
+    if cache:
+        system[0]["cache_control"] = {"type": "ephemeral"}
+
+    with limit:
+        anthropic_response = client.with_options(**options).messages.create(
             model=config.model,
-            max_tokens=max_tokens,
+            max_tokens=note_type.max_tokens,
+            system=system,
             messages=[
-                {"role": "user", "content": full_prompt},
+                {"role": "user", "content": prompt},
             ],
         )
-        intelligent_notes.append(
-            IntelligentNote(
-                title=note_type.title,
-                content=anthropic_response.content[0].text,
-                job_id=job_id,
-            )
-        )
-        logger.info(f"Casted to intelligent notes for {note_type.title}")
-    return intelligent_notes
+    return anthropic_response.content[0].text, anthropic_response.usage
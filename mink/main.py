@@ -1,40 +1,129 @@
 import logging
 import uuid
 import os
-import shutil
-import multiprocessing as mp
 import uvicorn
 import hydra
 import time
 import glob
-from multiprocessing import Queue
+import queue
+import threading
+import concurrent.futures
+from typing import Callable, Optional, Union
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, UploadFile, File, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from omegaconf import DictConfig
-from .models import Job, Meeting, JobResponse, MeetingResponse
-from .transcription import process_transcription
-from .ocr import process_ocr
-from .db import init_db, get_session
-from .llmcast import cast_to_intelligent_notes
+from .models import (
+    Job,
+    Meeting,
+    JobResponse,
+    JobStatusResponse,
+    MeetingResponse,
+    MeetingSummaryResponse,
+    TranscriptEventPage,
+    OnScreenEventPage,
+    SchedulerStatusResponse,
+    DbStatusResponse,
+    UploadResponse,
+)
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .db import (
+    init_db,
+    close_db,
+    get_session,
+    async_session,
+    get_async_session,
+    bulk_insert,
+    pool_status,
+)
+from .workers import WORKER_KINDS, start_worker_pools, stop_worker_pools
+from .scheduler import JobScheduler, QueueFullError
+from .uploads import UPLOAD_DIR, DEFAULT_CHUNK_SIZE, UploadStore, UploadOffsetError, save_upload
+from .llmcast import USAGE_STATS, cast_to_intelligent_notes
+from .metrics import (
+    Gauge,
+    http_request_seconds,
+    job_stage_seconds,
+    jobs_finished,
+    job_events,
+    llm_tokens,
+    render_metrics,
+    timed,
+)
+from .stages import StageGraph
+from .devices import resolve_device
+from .cache import result_cache_key, is_cache_enabled, load_cached_results
+from .queries import (
+    EVENT_MODELS,
+    parse_fields,
+    get_event_page,
+    job_response_data,
+    get_job_summaries,
+    get_meeting_with_events,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("mink")
 
 config_store = {}
+worker_pools = {}
+scheduler: Optional[JobScheduler] = None
+upload_store = UploadStore()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global scheduler
     if "config" in config_store:
-        init_db(config_store["config"])
+        cfg = config_store["config"]
+        init_db(cfg)
+        # Looks for CUDA devices now rather than on the first upload's cache key
+        resolve_device(cfg)
+        worker_pools.update(start_worker_pools(cfg))
+        scheduler_cfg = cfg.get("scheduler") or {}
+        scheduler = JobScheduler(
+            run_worker_task,
+            max_concurrent=int(scheduler_cfg.get("max_concurrent_jobs", 2)),
+            max_queued=int(scheduler_cfg.get("max_queued_jobs", 16)),
+            initial_job_seconds=float(scheduler_cfg.get("initial_job_seconds", 120)),
+        )
+        scheduler.start()
     yield
+    if scheduler is not None:
+        scheduler.shutdown()
+    stop_worker_pools(worker_pools)
+    await close_db()
+
+
+def queue_full_response(retry_after: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many jobs queued, try again later"},
+        headers={"Retry-After": str(retry_after)},
+    )
 
 
 app = FastAPI(title="Mink", lifespan=lifespan)
 
 
+def scheduler_gauge(key: str) -> dict:
+    return {(): scheduler.status()[key]} if scheduler is not None else {}
+
+
+def db_pool_gauge() -> dict:
+    return {
+        (("pool", name),): pool["checked_out"]
+        for name, pool in pool_status().items()
+        if pool["checked_out"] is not None
+    }
+
+
+Gauge("mink_jobs_queued", "Jobs waiting for a slot", lambda: scheduler_gauge("queued"))
+Gauge("mink_jobs_running", "Jobs being processed", lambda: scheduler_gauge("running"))
+Gauge("mink_db_connections_checked_out", "Connections in use by pool", db_pool_gauge)
+
+
 @app.middleware("http")
 async def verify_api_key(request: Request, call_next):
     if request.url.path in ["/docs", "/openapi.json", "/redoc"]:
@@ -54,54 +143,308 @@ async def verify_api_key(request: Request, call_next):
     return await call_next(request)
 
 
-def run_transcription_worker(
-    job_id: str, video_path: str, config: DictConfig, queue: Queue
+@app.middleware("http")
+async def time_request(request: Request, call_next):
+    """
+    Observes the latency of each request, labelled with the route's path template
+    so that job ids don't make a label each.
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=str(response.status_code),
+    )
+    return response
+
+
+def set_job_status(job_id: str, status: str, cacheable: bool = True):
+    """
+    Sets the job's status. A job that isn't cacheable loses its cache key, so its
+    results are never reused for an identical upload.
+    """
+    with next(get_session()) as session:
+        db_job = session.get(Job, job_id)
+        if db_job:
+            db_job.job_status = status
+            if not cacheable:
+                db_job.cache_key = None
+            session.add(db_job)
+            session.commit()
+        else:
+            logger.error(f"Job {job_id}: Job not found in DB during status update.")
+
+
+def update_job_stats(job_id: str, stats: dict):
+    """
+    Merges counters into Job.stats. The JSON column is reassigned since in-place
+    changes to it are not tracked.
+    """
+    if not stats:
+        return
+    with next(get_session()) as session:
+        db_job = session.get(Job, job_id)
+        if db_job:
+            db_job.stats = {**(db_job.stats or {}), **stats}
+            session.add(db_job)
+            session.commit()
+        else:
+            logger.error(f"Job {job_id}: Job not found in DB during stats update.")
+
+
+def save_partial_results(
+    job_id: str, events: list, processed_seconds: float, duration: Optional[float]
+) -> float:
+    """
+    Saves a batch of transcript/OCR events and the job's progress in one transaction.
+    Returns the seconds spent inserting the events.
+    """
+    with next(get_session()) as session:
+        elapsed = bulk_insert(session, events)
+        db_job = session.get(Job, job_id)
+        if db_job:
+            db_job.processed_seconds = processed_seconds
+            if duration is not None:
+                db_job.duration = duration
+            session.add(db_job)
+        session.commit()
+    return elapsed
+
+
+class JobProgress:
+    """
+    Progress of the worker stages of a job, shared between their threads. The
+    job's processed_seconds is that of the slowest worker. timings adds up the
+    seconds spent in each step of the job, as stored in Job.timings.
+    """
+
+    def __init__(self, kinds):
+        self.lock = threading.Lock()
+        self.processed = {kind: 0.0 for kind in kinds}
+        self.events = {kind: [] for kind in kinds}
+        self.finished = set()
+        self.duration: Optional[float] = None
+        self.stats = {}
+        self.timings = {}
+        self.insert_seconds = 0.0
+
+    def update(self, kind: str, events: list, processed: float, duration: Optional[float]):
+        with self.lock:
+            self.events[kind].extend(events)
+            self.processed[kind] = processed
+            if duration is not None:
+                self.duration = duration
+
+    def finish(self, kind: str, stats: dict):
+        stats = dict(stats)
+        timings = stats.pop("timings", {})
+        with self.lock:
+            self.finished.add(kind)
+            self.stats.update(stats)
+        for name, seconds in timings.items():
+            self.add_timing(name, seconds)
+
+    def add_timing(self, name: str, seconds: float):
+        with self.lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def processed_seconds(self) -> float:
+        with self.lock:
+            return min(
+                self.duration if kind in self.finished and self.duration else processed
+                for kind, processed in self.processed.items()
+            )
+
+    def events_so_far(self, kind: str) -> list:
+        with self.lock:
+            return list(self.events[kind])
+
+    def add_insert_seconds(self, seconds: float):
+        with self.lock:
+            self.insert_seconds += seconds
+        self.add_timing("db_write", seconds)
+
+
+def run_worker(job_id: str, kind: str, file_path: str, progress: JobProgress) -> list:
+    """
+    Runs transcription or OCR for a file on the warm worker pool. Events are saved
+    to the database in batches while the worker runs, along with the job's progress.
+    Returns all events, or raises if the worker failed.
+    """
+    logger.info(f"Job {job_id}: Submitting to {kind} workers")
+    updates = queue.Queue()
+    future = worker_pools[kind].submit(job_id, file_path, updates)
+
+    unsaved = []
+    while True:
+        # The worker queues its last events before finishing, so once it is done
+        # an empty queue means everything was received
+        done = future.done()
+        try:
+            _, events, processed, duration = updates.get(timeout=0.5)
+        except queue.Empty:
+            if done:
+                break
+            continue
+
+        progress.update(kind, events, processed, duration)
+        unsaved.extend(events)
+        try:
+            progress.add_insert_seconds(
+                save_partial_results(
+                    job_id, unsaved, progress.processed_seconds(), progress.duration
+                )
+            )
+            unsaved = []
+        except Exception as e:
+            logger.error(f"Job {job_id}: Failed to save partial {kind} results, will retry: {e}")
+
+    # Doesn't block anymore, raises if the worker failed
+    events, stats = future.result()
+    progress.finish(kind, stats)
+    progress.add_insert_seconds(
+        save_partial_results(job_id, unsaved, progress.processed_seconds(), progress.duration)
+    )
+    return events
+
+
+def save_cached_results(job_id: str, cached: tuple, progress: JobProgress) -> tuple:
+    full_transcript, full_ocr = cached
+    duration = full_transcript[-1].end if full_transcript else 0.0
+    progress.update("transcription", full_transcript, duration, duration)
+    progress.update("ocr", full_ocr, duration, duration)
+    progress.add_insert_seconds(
+        save_partial_results(job_id, full_transcript + full_ocr, duration, duration)
+    )
+    return cached
+
+
+def finish_transcript(job_id: str, full_transcript: list):
+    """
+    Fails the job when nobody spoke, otherwise sets the meeting's duration.
+    """
+    if len(full_transcript) == 0:
+        raise ValueError("No transcription events found, did nobody speak?")
+
+    with next(get_session()) as session:
+        db_job = session.get(Job, job_id)
+        if db_job:
+            meeting = session.get(Meeting, db_job.meeting_id)
+            if meeting:
+                meeting.duration = full_transcript[-1].end
+                session.add(meeting)
+                session.commit()
+        else:
+            logger.error(f"Job {job_id}: Job not found in DB during save.")
+
+
+def cast_notes(
+    job_id: str,
+    cfg: DictConfig,
+    full_transcript: list,
+    wait_for_ocr: Callable[[Optional[float]], list],
+    progress: JobProgress,
 ):
+    """
+    Casts and saves the intelligent notes. Waits at most stages.ocr_deadline seconds
+    for OCR, then casts with the on-screen events received so far.
+    """
+    if not cfg.cast:
+        logger.info(
+            f"Job {job_id}: No LLM casting config found, skipping intelligent notes."
+        )
+        return
+
+    stages_cfg = cfg.get("stages") or {}
+    deadline = stages_cfg.get("ocr_deadline")
     try:
-        logger.info(f"Job {job_id}: Starting transcription worker")
-        events = process_transcription(video_path, job_id, config)
+        full_ocr = wait_for_ocr(None if deadline is None else float(deadline))
+    # A separate class from the builtin TimeoutError before Python 3.11
+    except concurrent.futures.TimeoutError:
+        full_ocr = progress.events_so_far("ocr")
         logger.info(
-            f"Job {job_id}: Transcription finished. Found {len(events)} events."
+            f"Job {job_id}: OCR still running after {deadline}s, casting with "
+            f"{len(full_ocr)} on-screen events so far."
         )
-        queue.put(events)
     except Exception as e:
-        logger.error(f"Job {job_id}: Transcription failed: {e}")
-        queue.put([])
+        full_ocr = progress.events_so_far("ocr")
+        logger.error(
+            f"Job {job_id}: OCR failed, casting with {len(full_ocr)} on-screen events so far: {e}"
+        )
 
+    logger.info(f"Job {job_id}: Starting intelligent notes casting.")
+    cast_stats = {}
+    llm_timings = {}
+    with timed(llm_timings, "llm"):
+        intelligent_notes = cast_to_intelligent_notes(
+            full_transcript, full_ocr, job_id, cfg.cast, cast_stats
+        )
+    progress.add_timing("llm", llm_timings["llm"])
+    update_job_stats(job_id, cast_stats)
+    for key in USAGE_STATS.values():
+        if cast_stats.get(key):
+            llm_tokens.inc(cast_stats[key], type=key.removeprefix("llm_").removesuffix("_tokens"))
 
-def run_ocr_worker(job_id: str, video_path: str, config: DictConfig, queue: Queue):
-    try:
-        logger.info(f"Job {job_id}: Starting OCR worker")
-        events = process_ocr(video_path, job_id, config)
-        logger.info(f"Job {job_id}: OCR finished. Found {len(events)} events.")
-        queue.put(events)
-    except Exception as e:
-        logger.error(f"Job {job_id}: OCR failed: {e}")
-        queue.put([])
+    with next(get_session()) as session:
+        db_job = session.get(Job, job_id)
+        if db_job:
+            progress.add_insert_seconds(bulk_insert(session, intelligent_notes))
+            session.commit()
+            logger.info(f"Job {job_id}: Saved intelligent notes to database.")
+        else:
+            logger.error(f"Job {job_id}: Job not found in DB during save.")
+
+
+def save_job_timings(job: Job, started: float, progress: JobProgress):
+    """
+    Stores the seconds the job spent in each step on Job.timings and observes
+    them in the job stage histogram.
+    """
+    timings = dict(progress.timings)
+    if job.time_started is not None:
+        timings["queue_wait"] = max(0.0, started - job.time_started)
+        timings["total"] = time.time() - job.time_started
+    timings = {name: round(seconds, 4) for name, seconds in timings.items()}
+
+    for name, seconds in timings.items():
+        job_stage_seconds.observe(seconds, stage=name)
+    with next(get_session()) as session:
+        db_job = session.get(Job, job.job_id)
+        if db_job:
+            db_job.timings = timings
+            session.add(db_job)
+            session.commit()
 
 
-def set_job_status(job_id: str, status: str):
+def save_stage_times(job_id: str, timings: dict):
     with next(get_session()) as session:
         db_job = session.get(Job, job_id)
         if db_job:
-            db_job.job_status = status
+            db_job.stages = timings
             session.add(db_job)
             session.commit()
-        else:
-            logger.error(f"Job {job_id}: Job not found in DB during status update.")
 
 
 def run_worker_task(job: Job):
+    """
+    Runs a job as a graph of stages:
+    - transcription and ocr run in parallel, each saving its events as they come
+    - meeting checks the transcript and updates the meeting once transcription is done
+    - cast starts after meeting, waiting for ocr at most stages.ocr_deadline seconds
+    When the job's results are cached, a single cache stage replaces transcription and ocr.
+    """
     job_id = job.job_id
+    started = time.time()
     try:
         set_job_status(job_id, "started")
     except Exception as e:
         logger.error(f"Job {job_id}: Failed to update DB status to started: {e}")
         return
 
-    upload_dir = "/tmp/mink"
-
-    files = glob.glob(os.path.join(upload_dir, f"{job_id}_*"))
+    files = glob.glob(os.path.join(UPLOAD_DIR, f"{job_id}_*"))
     if not files:
         logger.error(f"Job {job_id}: Could not find video file")
         return
@@ -112,168 +455,377 @@ def run_worker_task(job: Job):
         return
     cfg = config_store["config"]
 
-    transcription_queue = mp.Queue()
-    ocr_queue = mp.Queue()
-
-    p_transcribe = mp.Process(
-        target=run_transcription_worker,
-        args=(job_id, file_path, cfg, transcription_queue),
-    )
-    p_ocr = mp.Process(target=run_ocr_worker, args=(job_id, file_path, cfg, ocr_queue))
-
-    p_transcribe.start()
-    p_ocr.start()
+    cached = None
+    if job.cache_key and is_cache_enabled(cfg):
+        try:
+            with next(get_session()) as session:
+                cached = load_cached_results(session, job.cache_key, job_id)
+        except Exception as e:
+            logger.error(f"Job {job_id}: Failed to look up cached results: {e}")
+
+    progress = JobProgress(WORKER_KINDS)
+    graph = StageGraph(f"Job {job_id}", lambda timings: save_stage_times(job_id, timings))
+    if cached is not None:
+        graph.add("cache", lambda: save_cached_results(job_id, cached, progress))
+        transcript_stage, ocr_stage = "cache", "cache"
+    else:
+        graph.add(
+            "transcription",
+            lambda: run_worker(job_id, "transcription", file_path, progress),
+        )
+        graph.add("ocr", lambda: run_worker(job_id, "ocr", file_path, progress))
+        transcript_stage, ocr_stage = "transcription", "ocr"
 
-    # Retrieve results
-    # Note: get() is blocking by default, which is what we want here as we wait for workers
-    full_transcript = transcription_queue.get()
-    full_ocr = ocr_queue.get()
+    def get_transcript() -> list:
+        result = graph.result(transcript_stage)
+        return result[0] if cached is not None else result
 
-    p_transcribe.join()
-    p_ocr.join()
+    def wait_for_ocr(timeout: Optional[float]) -> list:
+        result = graph.result(ocr_stage, timeout)
+        return result[1] if cached is not None else result
 
-    logger.info(
-        f"Job {job_id}: Retrieved {len(full_transcript)} transcript events and {len(full_ocr)} OCR events."
+    graph.add(
+        "meeting",
+        lambda: finish_transcript(job_id, get_transcript()),
+        after=[transcript_stage],
     )
-    if len(full_transcript) == 0:
-        logger.error(f"Job {job_id}: No transcription events found, marking job as failed or did nobody speak?")
-        set_job_status(job_id, "failed")
-        return
+    graph.add(
+        "cast",
+        lambda: cast_notes(job_id, cfg, get_transcript(), wait_for_ocr, progress),
+        after=["meeting"],
+    )
+    graph.run()
 
     try:
-        # We use a new session here since this runs in a separate thread (BackgroundTasks)
-        with next(get_session()) as session:
-            session.expire_on_commit = False
-            db_job = session.get(Job, job_id)
-            if db_job:
-                transcript_duration = full_transcript[-1].end
-                for event in full_transcript:
-                    session.add(event)
-                    db_job.transcript_events.append(event)
-                for event in full_ocr:
-                    session.add(event)
-                    db_job.ocr_events.append(event)
-
-                session.add(db_job)
-
-                meeting = session.get(Meeting, db_job.meeting_id)
-                if meeting:
-                    meeting.duration = transcript_duration
-                    session.add(meeting)
+        update_job_stats(
+            job_id, {**progress.stats, "db_insert_seconds": round(progress.insert_seconds, 4)}
+        )
+    except Exception as e:
+        logger.error(f"Job {job_id}: Failed to save stats: {e}")
+
+    for kind in WORKER_KINDS:
+        job_events.observe(len(progress.events_so_far(kind)), kind=kind)
+    if graph.succeeded("meeting"):
+        logger.info(f"Job {job_id}: Completed with {len(get_transcript())} transcript events.")
+        job_status = "completed"
+    else:
+        job_status = "failed"
+    # A completed job can still be missing some or all of its OCR events
+    cacheable = graph.succeeded(transcript_stage) and graph.succeeded(ocr_stage)
+    try:
+        save_job_timings(job, started, progress)
+    except Exception as e:
+        logger.error(f"Job {job_id}: Failed to save timings: {e}")
+    jobs_finished.inc(status=job_status)
+    set_job_status(job_id, job_status, cacheable)
 
-                session.commit()
-                logger.info(f"Job {job_id}: Saved results to database.")
-            else:
-                logger.error(f"Job {job_id}: Job not found in DB during save.")
 
-    except Exception as e:
-        logger.error(f"Job {job_id}: Failed to save to DB: {e}")
-        return
+def upload_chunk_size() -> int:
+    uploads_cfg = config_store["config"].get("uploads") or {}
+    return int(uploads_cfg.get("chunk_size", DEFAULT_CHUNK_SIZE))
 
-    if not cfg.cast:
-        logger.info(
-            f"Job {job_id}: No LLM casting config found, skipping intelligent notes."
-        )
-        set_job_status(job_id, "completed")
-        return
 
+async def create_job(job_id: str, file_path: str, content_hash: str, priority: int):
+    """
+    Creates the Meeting and Job records for an uploaded file and queues the job.
+    """
     try:
-        logger.info(f"Job {job_id}: Starting intelligent notes casting.")
-        intelligent_notes = cast_to_intelligent_notes(
-            full_transcript, full_ocr, job_id, cfg.cast
-        )
-    except Exception as e:
-        logger.error(f"Job {job_id}: Intelligent notes casting failed: {e}")
-        set_job_status(job_id, "completed")
-        return
-        
-    try:
-        with next(get_session()) as session:
-            db_job = session.get(Job, job_id)
-            if db_job:
-                for note in intelligent_notes:
-                    session.add(note)
-                    db_job.intelligent_notes.append(note)
-                session.add(db_job)
-                session.commit()
-                logger.info(f"Job {job_id}: Saved intelligent notes to database.")
-            else:
-                logger.error(f"Job {job_id}: Job not found in DB during save.")
+        async with async_session() as session:
+            meeting = Meeting(name=f"Meeting {job_id}", time_started=time.time())
+            session.add(meeting)
+            await session.commit()
+            await session.refresh(meeting)
+
+            job = Job(
+                job_id=job_id,
+                job_status="queued",
+                meeting_id=meeting.id,
+                time_started=time.time(),
+                content_hash=content_hash,
+                cache_key=result_cache_key(content_hash, config_store["config"]),
+            )
+            session.add(job)
+            await session.commit()
+            await session.refresh(job)
+
+            try:
+                scheduler.submit(job, priority)
+            except QueueFullError as e:
+                logger.warning(f"Job {job_id}: Queue filled up before the job could be queued")
+                job.job_status = "failed"
+                session.add(job)
+                await session.commit()
+                os.remove(file_path)
+                return queue_full_response(e.retry_after)
+            return job
     except Exception as e:
-        logger.error(f"Job {job_id}: Failed to save to DB: {e}")
-        set_job_status(job_id, "failed")
-
-    set_job_status(job_id, "completed")
+        logger.error(f"Failed to create DB records: {e}")
+        return Job(job_id=job_id, job_status="failed")
 
 
 @app.post("/take-notes", response_model=Job)
-async def take_notes(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def take_notes(file: UploadFile = File(...), priority: int = 0):
     job_id = str(uuid.uuid4())
     logger.info(f"Received request, job_id={job_id}")
-    upload_dir = "/tmp/mink"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, f"{job_id}_{file.filename}")
+    if "config" not in config_store or scheduler is None:
+        logger.error("Config not initialized!")
+        return Job(job_id=job_id, job_status="failed")
+    # Reject early so a full queue doesn't cost us a copy of the upload
+    if scheduler.is_full():
+        return queue_full_response(scheduler.retry_after())
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(UPLOAD_DIR, f"{job_id}_{os.path.basename(file.filename)}")
 
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        content_hash = await save_upload(file, file_path, upload_chunk_size())
     finally:
-        file.file.close()
+        await file.close()
+    logger.info(f"Job {job_id}: Saved upload with sha256 {content_hash}")
 
-    if "config" not in config_store:
-        logger.error("Config not initialized!")
-        return Job(job_id=job_id, job_status="failed")
+    return await create_job(job_id, file_path, content_hash, priority)
+
+
+def upload_not_found() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={"detail": "Upload not found"},
+    )
 
-    # Start job
-    # Create Meeting and Job
+
+@app.post("/uploads", response_model=UploadResponse)
+async def create_upload(filename: str, size: Optional[int] = None):
+    """
+    Starts a resumable upload. Send the content with PATCH /uploads/{upload_id}
+    and finish it with POST /uploads/{upload_id}/complete.
+    """
+    upload = upload_store.create(filename, size)
+    return UploadResponse(**upload.to_dict())
+
+
+@app.get("/uploads/{upload_id}", response_model=UploadResponse)
+async def get_upload(upload_id: str):
+    upload = upload_store.get(upload_id)
+    if upload is None:
+        return upload_not_found()
+    return UploadResponse(**upload.to_dict())
+
+
+@app.patch("/uploads/{upload_id}", response_model=UploadResponse)
+async def append_upload(upload_id: str, request: Request):
+    """
+    Appends the raw request body to an upload. The Upload-Offset header must
+    match the number of bytes already received (see GET /uploads/{upload_id}).
+    """
+    upload = upload_store.get(upload_id)
+    if upload is None:
+        return upload_not_found()
     try:
-        with next(get_session()) as session:
-            meeting = Meeting(name=f"Meeting {job_id}", time_started=time.time())
-            session.add(meeting)
-            session.commit()
-            session.refresh(meeting)
+        offset = int(request.headers.get("Upload-Offset", "0"))
+    except ValueError:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"detail": "Upload-Offset must be an integer"},
+        )
 
-            job = Job(job_id=job_id, job_status="queued", meeting_id=meeting.id, time_started=time.time())
-            session.add(job)
-            session.commit()
-            session.refresh(job)
-    except Exception as e:
-        logger.error(f"Failed to create DB records: {e}")
+    try:
+        await upload.append(offset, request.stream())
+    except UploadOffsetError as e:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": str(e), "offset": e.expected},
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": str(e)},
+        )
+    return UploadResponse(**upload.to_dict())
+
+
+@app.post("/uploads/{upload_id}/complete", response_model=Job)
+async def complete_upload(upload_id: str, priority: int = 0):
+    upload = upload_store.get(upload_id)
+    if upload is None:
+        return upload_not_found()
+    if not upload.is_complete:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "Upload is not complete", "offset": upload.offset},
+        )
+
+    job_id = str(uuid.uuid4())
+    logger.info(f"Received upload {upload_id}, job_id={job_id}")
+    if "config" not in config_store or scheduler is None:
+        logger.error("Config not initialized!")
         return Job(job_id=job_id, job_status="failed")
+    if scheduler.is_full():
+        return queue_full_response(scheduler.retry_after())
 
-    background_tasks.add_task(run_worker_task, job)
-    return job
+    file_path = os.path.join(UPLOAD_DIR, f"{job_id}_{upload.filename}")
+    content_hash = await upload.finish(file_path)
+    upload_store.remove(upload_id)
+    logger.info(f"Job {job_id}: Saved upload with sha256 {content_hash}")
 
+    return await create_job(job_id, file_path, content_hash, priority)
 
-@app.get("/job/{job_id}", response_model=JobResponse)
-async def get_job(job_id: str):
-    with next(get_session()) as session:
-        job = session.get(Job, job_id)
-        if job:
-            # Force load relationships before session closes
-            _ = job.transcript_events
-            _ = job.ocr_events
-            _ = job.intelligent_notes
-            return JobResponse.model_validate(job)
-        else:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={"detail": "Job not found"},
-            )
 
-@app.get("/meeting/{meeting_id}", response_model=MeetingResponse)
-async def get_meeting(meeting_id: int):
-    with next(get_session()) as session:
-        meeting = session.get(Meeting, meeting_id)
-        if meeting:
-            # Force load relationships before session closes
-            _ = meeting.jobs
+@app.get("/status", response_model=SchedulerStatusResponse)
+async def get_status():
+    if scheduler is None:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Scheduler not initialized"},
+        )
+    return SchedulerStatusResponse(**scheduler.status())
+
+
+@app.get("/db/status", response_model=DbStatusResponse)
+async def get_db_status():
+    """
+    Usage of the connection pools and how long sessions waited for a connection.
+    """
+    return DbStatusResponse(**pool_status())
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def job_not_found() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={"detail": "Job not found"},
+    )
+
+
+def bad_request(detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": detail},
+    )
+
+
+@app.get("/job/{job_id}", response_model=JobResponse, response_model_exclude_unset=True)
+async def get_job(
+    job_id: str,
+    fields: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Returns a job with all its events. fields= takes a comma separated list of
+    JobResponse fields to return instead, and start/end limit the events to a
+    time window in seconds.
+    """
+    try:
+        selected = parse_fields(fields)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    job = await session.get(Job, job_id)
+    if job:
+        return JobResponse(**await job_response_data(session, job, selected, start, end))
+    else:
+        return job_not_found()
+
+
+@app.get("/job/{job_id}/status", response_model=JobStatusResponse)
+async def get_job_status(job_id: str, session: AsyncSession = Depends(get_async_session)):
+    """
+    Status and progress of a job without its events, meant for polling.
+    """
+    job = await session.get(Job, job_id)
+    if job:
+        return JobStatusResponse.model_validate(job)
+    else:
+        return job_not_found()
+
+
+async def event_page(
+    session: AsyncSession,
+    kind: str,
+    job_id: str,
+    start: Optional[float],
+    end: Optional[float],
+    cursor: Optional[str],
+    limit: int,
+):
+    if await session.get(Job, job_id) is None:
+        return job_not_found()
+    try:
+        events, next_cursor = await get_event_page(
+            session, EVENT_MODELS[kind], job_id, start, end, cursor, limit
+        )
+    except ValueError as e:
+        return bad_request(str(e))
+    return {"events": events, "next_cursor": next_cursor}
+
+
+@app.get("/job/{job_id}/transcript", response_model=TranscriptEventPage)
+async def get_transcript_events(
+    job_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Pages through a job's transcript in time order. Pass the returned next_cursor
+    to get the following page.
+    """
+    return await event_page(session, "transcript", job_id, start, end, cursor, limit)
+
+
+@app.get("/job/{job_id}/ocr", response_model=OnScreenEventPage)
+async def get_ocr_events(
+    job_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Pages through a job's on-screen events in time order, like /job/{job_id}/transcript.
+    """
+    return await event_page(session, "ocr", job_id, start, end, cursor, limit)
+
+@app.get(
+    "/meeting/{meeting_id}", response_model=Union[MeetingSummaryResponse, MeetingResponse]
+)
+async def get_meeting(
+    meeting_id: int, events: bool = False, session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Returns a meeting with the event counts of its jobs. With events=true, every
+    job is returned in full with all its events instead.
+    """
+    if events:
+        meeting = await get_meeting_with_events(session, meeting_id)
+    else:
+        meeting = await session.get(Meeting, meeting_id)
+    if meeting:
+        if events:
             return MeetingResponse.model_validate(meeting)
-        else:
-            return JSONResponse(
-                status_code=status.HTTP_404_NOT_FOUND,
-                content={"detail": "Meeting not found"},
-            )
+        return MeetingSummaryResponse(
+            id=meeting.id,
+            name=meeting.name,
+            time_started=meeting.time_started,
+            duration=meeting.duration,
+            jobs=await get_job_summaries(session, meeting_id),
+        )
+    else:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={"detail": "Meeting not found"},
+        )
 
 
 @hydra.main(version_base=None, config_path="../config", config_name="config")
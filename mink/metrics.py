@@ -0,0 +1,160 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Metrics in the Prometheus text format. A handful of metrics doesn't need a
+# client library, and these are shared by the HTTP handlers and the job threads.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+COUNT_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], name: str) -> Iterator[None]:
+    """
+    Adds the seconds spent in the block to timings[name].
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed_iter(iterable: Iterable, timings: Optional[Dict[str, float]], name: str) -> Iterator:
+    """
+    Yields from iterable, adding the seconds spent producing each item to timings[name].
+    """
+    iterator = iter(iterable)
+    while True:
+        with timed(timings, name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            return [f"{self.name}{_format_labels(k)} {v}" for k, v in self.values.items()]
+
+
+class Gauge(Metric):
+    """
+    A value read at scrape time from callback, which returns {labels: value}.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable[[], Dict[Labels, float]]):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        return [f"{self.name}{_format_labels(k)} {v}" for k, v in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (bucket counts, sum, count)
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts, total, count = self.values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                counts[index] += 1
+            self.values[key] = [counts, total + value, count + 1]
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(key + (("le", f"{bound}"),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+http_request_seconds = Histogram(
+    "mink_http_request_duration_seconds", "Latency of HTTP requests by route"
+)
+job_stage_seconds = Histogram(
+    "mink_job_stage_duration_seconds",
+    "Time jobs spent in each stage: queue_wait, scene_detection, text_detection, ocr, asr, db_write, llm, total",
+)
+model_load_seconds = Histogram(
+    "mink_model_load_duration_seconds", "Time worker processes took to load their model"
+)
+jobs_finished = Counter("mink_jobs_finished_total", "Finished jobs by final status")
+job_events = Histogram(
+    "mink_job_events", "Transcript and on-screen events saved per job", COUNT_BUCKETS
+)
+llm_tokens = Counter("mink_llm_tokens_total", "LLM tokens used for intelligent notes by type")
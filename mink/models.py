@@ -1,9 +1,13 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship, JSON
 from pydantic import BaseModel
 
 
 class TranscriptEvent(SQLModel, table=True):
+    # Covers reading a job's events in time order or within a time window
+    __table_args__ = (Index("ix_transcriptevent_job_id_start", "job_id", "start"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     speaker_name: Optional[str] = None
     content: str
@@ -15,6 +19,8 @@ class TranscriptEvent(SQLModel, table=True):
 
 
 class OnScreenEvent(SQLModel, table=True):
+    __table_args__ = (Index("ix_onscreenevent_job_id_start", "job_id", "start"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     speaker_name: Optional[str] = None
     content: str
@@ -39,8 +45,18 @@ class Meeting(SQLModel, table=True):
 class Job(SQLModel, table=True):
     job_id: str = Field(primary_key=True)
     job_status: str
-    meeting_id: Optional[int] = Field(default=None, foreign_key="meeting.id")
+    meeting_id: Optional[int] = Field(default=None, foreign_key="meeting.id", index=True)
     time_started: Optional[float] = Field(default=None)
+    content_hash: Optional[str] = Field(default=None, index=True)
+    cache_key: Optional[str] = Field(default=None, index=True)
+    stats: Optional[Dict[str, Any]] = Field(default=None, sa_type=JSON)
+    # Progress of a running job, in seconds of the recording
+    duration: Optional[float] = Field(default=None)
+    processed_seconds: Optional[float] = Field(default=None)
+    # Stage name -> {"status", "start", "end"}, times in epoch seconds
+    stages: Optional[Dict[str, Any]] = Field(default=None, sa_type=JSON)
+    # Step name -> seconds spent: queue_wait, scene_detection, text_detection, ocr, asr, db_write, llm, total
+    timings: Optional[Dict[str, float]] = Field(default=None, sa_type=JSON)
 
     meeting: Optional[Meeting] = Relationship(back_populates="jobs")
     transcript_events: List[TranscriptEvent] = Relationship(back_populates="job")
@@ -52,7 +68,7 @@ class IntelligentNote(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     content: str
-    job_id: str = Field(foreign_key="job.job_id")
+    job_id: str = Field(foreign_key="job.job_id", index=True)
 
     job: Optional["Job"] = Relationship(back_populates="intelligent_notes")
 
@@ -93,12 +109,41 @@ class JobResponse(BaseModel):
     job_status: str
     meeting_id: Optional[int] = None
     time_started: Optional[float] = None
+    content_hash: Optional[str] = None
+    stats: Optional[Dict[str, Any]] = None
+    duration: Optional[float] = None
+    processed_seconds: Optional[float] = None
+    stages: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, float]] = None
     transcript_events: List[TranscriptEventResponse] = []
     ocr_events: List[OnScreenEventResponse] = []
     intelligent_notes: List[IntelligentNoteResponse] = []
 
     model_config = {"from_attributes": True}
     
+class JobStatusResponse(BaseModel):
+    job_id: str
+    job_status: str
+    meeting_id: Optional[int] = None
+    time_started: Optional[float] = None
+    duration: Optional[float] = None
+    processed_seconds: Optional[float] = None
+    stages: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, float]] = None
+
+    model_config = {"from_attributes": True}
+
+
+class TranscriptEventPage(BaseModel):
+    events: List[TranscriptEventResponse]
+    next_cursor: Optional[str] = None
+
+
+class OnScreenEventPage(BaseModel):
+    events: List[OnScreenEventResponse]
+    next_cursor: Optional[str] = None
+
+
 class MeetingResponse(BaseModel):
     id: Optional[int]
     name: str
@@ -107,3 +152,57 @@ class MeetingResponse(BaseModel):
     jobs: List[JobResponse] = []
 
     model_config = {"from_attributes": True}
+
+
+class JobSummaryResponse(BaseModel):
+    job_id: str
+    job_status: str
+    time_started: Optional[float] = None
+    duration: Optional[float] = None
+    processed_seconds: Optional[float] = None
+    transcript_event_count: int = 0
+    ocr_event_count: int = 0
+    intelligent_note_count: int = 0
+
+
+class MeetingSummaryResponse(BaseModel):
+    id: Optional[int]
+    name: str
+    time_started: float
+    duration: float = 0.0
+    jobs: List[JobSummaryResponse] = []
+
+    model_config = {"from_attributes": True}
+
+
+class SchedulerStatusResponse(BaseModel):
+    running: int
+    queued: int
+    max_concurrent_jobs: int
+    max_queued_jobs: int
+    completed: int
+    avg_job_seconds: float
+    estimated_wait_seconds: float
+
+
+class PoolStatusResponse(BaseModel):
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class DbStatusResponse(BaseModel):
+    # Pool of the job threads
+    jobs: PoolStatusResponse
+    # Pool of the HTTP handlers
+    api: PoolStatusResponse
+
+
+class UploadResponse(BaseModel):
+    upload_id: str
+    filename: str
+    size: Optional[int] = None
+    offset: int
@@ -2,158 +2,836 @@ import torch
 import logging
 import cv2
 import easyocr
-from typing import Generator, List
-from scenedetect import VideoManager, SceneManager
+import numpy as np
+from typing import Any, Callable, Generator, Iterable, List, NamedTuple, Optional, Tuple
+from scenedetect import open_video
 from scenedetect.detectors import ContentDetector
+from scenedetect.scene_manager import compute_downscale_factor
 from omegaconf import DictConfig
 from .models import OnScreenEvent
+from .metrics import timed, timed_iter
 
 logger = logging.getLogger(__name__)
 
+# Frames are downscaled to this width to look for text
+TEXT_DETECTION_WIDTH = 1280
+
+# Called with (events, processed_seconds, duration) as results are produced
+EventCallback = Callable[[List[OnScreenEvent], float, Optional[float]], None]
+
+
+def load_ocr_model(config: DictConfig) -> Optional[Any]:
+    """
+    Loads the OCR model selected by the ocr config so it can be reused across jobs.
+    """
+    if config.ocr.model == "easyocr":
+        return load_easyocr(config)
+    elif config.ocr.model == "lightonocr":
+        return load_lightonocr(config)
+    else:
+        logger.error(f"Unknown OCR model: {config.ocr.model}. Will not load OCR model.")
+        return None
+
 
 def process_ocr(
-    video_path: str, job_id: str, config: DictConfig
+    video_path: str,
+    job_id: str,
+    config: DictConfig,
+    model: Optional[Any] = None,
+    stats: Optional[dict] = None,
+    on_events: Optional[EventCallback] = None,
+    timings: Optional[dict] = None,
 ) -> List[OnScreenEvent]:
+    """
+    Runs the configured OCR backend. Per-job counters are written into `stats` if given.
+    on_events is called with the events of each OCR'd batch of scenes and the
+    video time processed so far. Seconds spent in scene detection and in OCR are
+    added to `timings` if given.
+    """
+    if stats is None:
+        stats = {}
     if config.ocr.model == "easyocr":
-        return process_ocr_easyocr(video_path, job_id, config)
+        return process_ocr_easyocr(
+            video_path, job_id, config, model, stats, on_events, timings
+        )
     elif config.ocr.model == "lightonocr":
-        return process_ocr_lightonocr(video_path, job_id, config)
+        return process_ocr_lightonocr(
+            video_path, job_id, config, model, stats, on_events, timings
+        )
     else:
         logger.error(f"Unknown OCR model: {config.ocr.model}. Will not process OCR.")
         return []
-    
-def process_ocr_lightonocr(
-    video_path: str, job_id: str, config: DictConfig
-) -> List[OnScreenEvent]:
+
+
+def load_lightonocr(config: DictConfig) -> Optional[tuple]:
     """
-    Uses LightOnOCR (https://huggingface.co/lightonai/LightOnOCR-2-1B).
-    Currently processes the entire video as a single chunk.
+    Loads LightOnOCR and its processor.
+    Returns (model, processor, device, dtype), or None if transformers is missing.
     """
-    logger.info(f"Starting OCR processing for {video_path} using LightOnOCR")
     try:
         from transformers import LightOnOcrForConditionalGeneration, LightOnOcrProcessor
     except ImportError:
         logger.error("transformers library not found. Please install it using 'uv sync --all-extras'.")
-        return []
-    
+        return None
+
     device = "mps" if torch.backends.mps.is_available() else "cuda" if torch.cuda.is_available() else "cpu"
     dtype = torch.float32 if device == "mps" else torch.bfloat16
 
+    logger.info(f"Loading LightOnOCR on {device}")
     model = LightOnOcrForConditionalGeneration.from_pretrained("lightonai/LightOnOCR-2-1B", torch_dtype=dtype).to(device)
     processor = LightOnOcrProcessor.from_pretrained("lightonai/LightOnOCR-2-1B")
-    
-    events = []
-    for frame, start_time, end_time in get_scene_frames(video_path):
-        conversation = [{"role": "user", "content": [{"type": "image", "data": frame}]}]
-
-        inputs = processor.apply_chat_template(
-            conversation,
-            add_generation_prompt=True,
-            tokenize=True,
-            return_dict=True,
-            return_tensors="pt",
-        )
-        inputs = {k: v.to(device=device, dtype=dtype) if v.is_floating_point() else v.to(device) for k, v in inputs.items()}
-
-        output_ids = model.generate(**inputs, max_new_tokens=1024)
-        generated_ids = output_ids[0, inputs["input_ids"].shape[1]:]
-        output_text = processor.decode(generated_ids, skip_special_tokens=True)
-        
-        if output_text:
-            # bbox and confidence not supported
-            events.append(
-                OnScreenEvent(
-                    speaker_name=None,
-                    content=output_text,
-                    start=float(start_time),
-                    end=float(end_time),
-                    bbox=[],
-                    confidence=1.0,
-                    job_id=job_id,
-                )
-            )    
-    
-    logger.info(f"OCR complete. Found {len(events)} events.")
+    # Batched generation needs prompts padded on the left
+    processor.tokenizer.padding_side = "left"
+    return model, processor, device, dtype
 
-    return events
-
-def process_ocr_easyocr(
-    video_path: str, job_id: str, config: DictConfig
-) -> List[OnScreenEvent]:
-    """
-    Detects scenes in a video and performs OCR on the middle frame of each scene.
-    """
-    logger.info(f"Starting OCR processing for {video_path}")
 
+def load_easyocr(config: DictConfig) -> easyocr.Reader:
     lang_list = config.ocr.lang
     logger.info(f"Loading EasyOCR with langs={lang_list}")
-    reader = easyocr.Reader(
+    return easyocr.Reader(
         lang_list,
         gpu=torch.cuda.is_available(),
     )
+
+
+def process_ocr_lightonocr(
+    video_path: str,
+    job_id: str,
+    config: DictConfig,
+    loaded: Optional[tuple] = None,
+    stats: Optional[dict] = None,
+    on_events: Optional[EventCallback] = None,
+    timings: Optional[dict] = None,
+) -> List[OnScreenEvent]:
+    """
+    Uses LightOnOCR (https://huggingface.co/lightonai/LightOnOCR-2-1B).
+    Scene frames are sent to generate() in batches of ocr.batch_size. With the text
+    filter, frames without text are skipped and only crops of their text regions
+    are sent, one event per crop.
+    """
+    logger.info(f"Starting OCR processing for {video_path} using LightOnOCR")
+    if loaded is None:
+        loaded = load_lightonocr(config)
+    if loaded is None:
+        return []
+    model, processor, device, dtype = loaded
+
+    batch_size = get_ocr_batch_size(config)
+    detector = get_text_detector(config)
+    if detector == "easyocr":
+        logger.warning("The easyocr text detector needs the easyocr model, using opencv")
+        detector = "opencv"
+    filter_cfg = config.ocr.get("text_filter") or {}
+    min_area = float(filter_cfg.get("min_area", 0.0005))
+    padding = int(filter_cfg.get("padding", 12))
+    max_crops = int(filter_cfg.get("max_crops", 4))
+
     events = []
-    for frame, start_time, end_time in get_scene_frames(video_path):
-        results = reader.readtext(frame)
-
-        # results format: [[bbox, text, conf], ...]
-        if results:
-            for res in results:
-                # For some reason EasyOCR returns XY,XY,XY,XY
-                raw_bbox = res[0]
-                bbox = [
-                    int(raw_bbox[0][0]),
-                    int(raw_bbox[0][1]),
-                    int(raw_bbox[2][0]),
-                    int(raw_bbox[2][1]),
-                ]
-                events.append(
+    scenes = timed_iter(get_ocr_frames(video_path, config, stats), timings, "scene_detection")
+    for batch in batched(scenes, batch_size):
+        # (index in batch, [x0, y0, x1, y1] or None for the whole frame)
+        crops = []
+        with timed(timings, "text_detection"):
+            for index, (frame, _, _) in enumerate(batch):
+                if detector is None:
+                    crops.append((index, None))
+                    continue
+                regions = find_text_regions(frame, min_area)
+                for box in merge_text_regions(regions, padding, max_crops, frame.shape):
+                    crops.append((index, box))
+        if detector is not None:
+            count_text_frames(stats, len(batch), len(batch) - len({index for index, _ in crops}))
+        if not crops:
+            if on_events is not None:
+                on_events([], float(batch[-1][2]), None)
+            continue
+
+        images = [
+            batch[index][0] if box is None
+            else np.ascontiguousarray(batch[index][0][box[1]:box[3], box[0]:box[2]])
+            for index, box in crops
+        ]
+        conversations = [
+            [{"role": "user", "content": [{"type": "image", "data": image}]}]
+            for image in images
+        ]
+
+        with timed(timings, "ocr"):
+            inputs = processor.apply_chat_template(
+                conversations,
+                add_generation_prompt=True,
+                tokenize=True,
+                return_dict=True,
+                return_tensors="pt",
+                padding=True,
+            )
+            inputs = {k: v.to(device=device, dtype=dtype) if v.is_floating_point() else v.to(device) for k, v in inputs.items()}
+
+            output_ids = model.generate(**inputs, max_new_tokens=1024)
+            # Prompts are left-padded, so generated tokens start at the same index in every row
+            generated_ids = output_ids[:, inputs["input_ids"].shape[1]:]
+            output_texts = processor.batch_decode(generated_ids, skip_special_tokens=True)
+
+        batch_events = []
+        for (index, box), output_text in zip(crops, output_texts):
+            _, start_time, end_time = batch[index]
+            if output_text:
+                # confidence not supported, bbox only for crops
+                batch_events.append(
                     OnScreenEvent(
                         speaker_name=None,
-                        content=res[1],
+                        content=output_text,
                         start=float(start_time),
                         end=float(end_time),
-                        bbox=bbox,
-                        confidence=float(res[2]),
+                        bbox=box or [],
+                        confidence=1.0,
                         job_id=job_id,
                     )
                 )
+        events.extend(batch_events)
+        if on_events is not None:
+            on_events(batch_events, float(batch[-1][2]), None)
 
+    log_text_frames(stats)
+    logger.info(f"OCR complete. Found {len(events)} events.")
 
+    return events
+
+
+def process_ocr_easyocr(
+    video_path: str,
+    job_id: str,
+    config: DictConfig,
+    reader: Optional[easyocr.Reader] = None,
+    stats: Optional[dict] = None,
+    on_events: Optional[EventCallback] = None,
+    timings: Optional[dict] = None,
+) -> List[OnScreenEvent]:
+    """
+    Detects scenes in a video and performs OCR on the middle frame of each scene,
+    ocr.batch_size frames at a time. EasyOCR only recognizes the text regions its
+    detector finds; with the opencv text filter, frames without text skip the
+    detector too.
+    """
+    logger.info(f"Starting OCR processing for {video_path}")
+
+    if reader is None:
+        reader = load_easyocr(config)
+    batch_size = get_ocr_batch_size(config)
+    detector = get_text_detector(config)
+    filter_cfg = config.ocr.get("text_filter") or {}
+    min_area = float(filter_cfg.get("min_area", 0.0005))
+
+    events = []
+    scenes = timed_iter(get_ocr_frames(video_path, config, stats), timings, "scene_detection")
+    for batch in batched(scenes, batch_size):
+        frames = [frame for frame, _, _ in batch]
+        if detector == "opencv":
+            with timed(timings, "text_detection"):
+                has_text = [bool(find_text_regions(frame, min_area)) for frame in frames]
+            frames = [frame for frame, text in zip(frames, has_text) if text]
+        else:
+            has_text = [True] * len(frames)
+
+        with timed(timings, "ocr"):
+            if len(frames) > 1 and all(frame.shape == frames[0].shape for frame in frames):
+                # Detection runs on the whole batch at once; recognition batches the crops
+                results = iter(reader.readtext_batched(frames, batch_size=batch_size))
+            else:
+                results = iter([reader.readtext(frame) for frame in frames])
+        batch_results = [next(results) if text else [] for text in has_text]
+        if detector is not None:
+            count_text_frames(stats, len(batch), sum(1 for result in batch_results if not result))
+
+        batch_events = []
+        for (_, start_time, end_time), results in zip(batch, batch_results):
+            batch_events.extend(
+                easyocr_events(results, start_time, end_time, job_id, config.ocr)
+            )
+        events.extend(batch_events)
+        if on_events is not None:
+            on_events(batch_events, float(batch[-1][2]), None)
+
+    log_text_frames(stats)
     logger.info(f"OCR complete. Found {len(events)} events.")
     return events
 
 
-def get_scene_frames(video_path: str) -> Generator[List[tuple], None, None]:
+def easyocr_events(
+    results: list,
+    start_time: float,
+    end_time: float,
+    job_id: str,
+    ocr_config: Optional[DictConfig] = None,
+) -> List[OnScreenEvent]:
+    """
+    Converts EasyOCR results of one frame ([[bbox, text, conf], ...]) to events.
+    Depending on ocr.group, there is one event per text block (default), per line
+    or per detected word box.
+    """
+    words = []
+    for res in results:
+        # For some reason EasyOCR returns XY,XY,XY,XY
+        raw_bbox = res[0]
+        bbox = [
+            int(raw_bbox[0][0]),
+            int(raw_bbox[0][1]),
+            int(raw_bbox[2][0]),
+            int(raw_bbox[2][1]),
+        ]
+        words.append(TextBox(bbox, res[1], float(res[2])))
+
+    ocr_config = ocr_config or {}
+    group = ocr_config.get("group", "block")
+    if group != "word":
+        grouping_cfg = ocr_config.get("grouping") or {}
+        words = group_text_boxes(
+            words,
+            blocks=group == "block",
+            line_overlap=float(grouping_cfg.get("line_overlap", 0.5)),
+            word_gap=float(grouping_cfg.get("word_gap", 1.5)),
+            line_gap=float(grouping_cfg.get("line_gap", 0.8)),
+        )
+
+    return [
+        OnScreenEvent(
+            speaker_name=None,
+            content=box.text,
+            start=float(start_time),
+            end=float(end_time),
+            bbox=box.bbox,
+            confidence=box.confidence,
+            job_id=job_id,
+        )
+        for box in words
+    ]
+
+
+class TextBox(NamedTuple):
+    bbox: List[int]  # x0, y0, x1, y1
+    text: str
+    confidence: float
+
+    @property
+    def height(self) -> int:
+        return max(1, self.bbox[3] - self.bbox[1])
+
+
+def _merge_boxes(boxes: List[TextBox], separator: str) -> TextBox:
     """
-    Utility function to get scenes from a video.
-    Returns list of (start_time, end_time) tuples in seconds.
+    Joins boxes into one with their union bbox and a confidence weighted by text length.
     """
-    cap = cv2.VideoCapture(video_path)
-    video_manager = VideoManager([video_path])
-    scene_manager = SceneManager()
-    scene_manager.add_detector(ContentDetector())
+    weights = [max(1, len(box.text)) for box in boxes]
+    return TextBox(
+        [
+            min(box.bbox[0] for box in boxes),
+            min(box.bbox[1] for box in boxes),
+            max(box.bbox[2] for box in boxes),
+            max(box.bbox[3] for box in boxes),
+        ],
+        separator.join(box.text for box in boxes),
+        sum(box.confidence * w for box, w in zip(boxes, weights)) / sum(weights),
+    )
+
+
+def _vertical_overlap(a: List[int], b: List[int]) -> float:
+    overlap = min(a[3], b[3]) - max(a[1], b[1])
+    return overlap / max(1, min(a[3] - a[1], b[3] - b[1]))
+
+
+def group_text_boxes(
+    words: List[TextBox],
+    blocks: bool = True,
+    line_overlap: float = 0.5,
+    word_gap: float = 1.5,
+    line_gap: float = 0.8,
+) -> List[TextBox]:
+    """
+    Groups word boxes of one frame into lines, and lines into blocks, in reading order.
+    Boxes are on the same line when they overlap vertically by line_overlap of the
+    smaller height and are at most word_gap line heights apart horizontally. A line
+    joins the block above when it starts within line_gap line heights below it and
+    overlaps it horizontally.
+    """
+    # Lines: sweep the boxes top to bottom, appending each to a line it overlaps
+    rows: List[List[TextBox]] = []
+    for word in sorted(words, key=lambda box: (box.bbox[1] + box.bbox[3]) / 2):
+        for row in reversed(rows):
+            if _vertical_overlap(_merge_boxes(row, " ").bbox, word.bbox) >= line_overlap:
+                row.append(word)
+                break
+        else:
+            rows.append([word])
+
+    # A row can hold several columns, split it where the horizontal gap is too wide
+    lines = []
+    for row in rows:
+        row.sort(key=lambda box: box.bbox[0])
+        segment = [row[0]]
+        for word in row[1:]:
+            height = max(segment[-1].height, word.height)
+            if word.bbox[0] - segment[-1].bbox[2] > word_gap * height:
+                lines.append(_merge_boxes(segment, " "))
+                segment = []
+            segment.append(word)
+        lines.append(_merge_boxes(segment, " "))
 
-    video_manager.set_downscale_factor()
-    video_manager.start()
+    lines.sort(key=lambda box: (box.bbox[1], box.bbox[0]))
+    if not blocks:
+        return lines
 
-    scene_manager.detect_scenes(frame_source=video_manager)
-    scene_list = scene_manager.get_scene_list()
+    grouped: List[List[TextBox]] = []
+    for line in lines:
+        for block in grouped:
+            last = block[-1]
+            gap = line.bbox[1] - last.bbox[3]
+            overlaps = min(last.bbox[2], line.bbox[2]) > max(last.bbox[0], line.bbox[0])
+            if overlaps and -line.height / 2 <= gap <= line_gap * line.height:
+                block.append(line)
+                break
+        else:
+            grouped.append([line])
+    return [_merge_boxes(block, "\n") for block in grouped]
 
-    for scene in scene_list:
-        start_time = scene[0].get_seconds()
-        end_time = scene[1].get_seconds()
-        # Get middle frame of scene
-        middle_time = (start_time + end_time) / 2
-        cap.set(cv2.CAP_PROP_POS_MSEC, middle_time * 1000)
-        ret, frame = cap.read()
 
-        if not ret:
-            logger.warning(f"Could not read frame at {middle_time}s")
+def get_text_detector(config: DictConfig) -> Optional[str]:
+    """
+    The detector deciding which frames have text: "easyocr", "opencv", or None
+    when ocr.text_filter is disabled.
+    """
+    filter_cfg = config.ocr.get("text_filter") or {}
+    if not filter_cfg.get("enabled", True):
+        return None
+    detector = filter_cfg.get("detector", "auto")
+    if detector == "auto":
+        return "easyocr" if config.ocr.model == "easyocr" else "opencv"
+    return detector
+
+
+def find_text_regions(frame: np.ndarray, min_area: float = 0.0005) -> List[List[int]]:
+    """
+    Boxes [x0, y0, x1, y1] of likely lines of text in an RGB frame: strong edges
+    joined horizontally into wide, partly filled rows. It costs a few milliseconds
+    a frame and would rather find text that isn't there than miss some.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    scale = min(1.0, TEXT_DETECTION_WIDTH / gray.shape[1])
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    height, width = gray.shape
+
+    gradient = cv2.morphologyEx(
+        gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    )
+    otsu, _ = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Otsu alone turns sensor noise into edges on flat frames
+    _, edges = cv2.threshold(gradient, max(otsu, 40), 255, cv2.THRESH_BINARY)
+    rows = cv2.morphologyEx(
+        edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 80), 1))
+    )
+    contours, _ = cv2.findContours(rows, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area * width * height or h < 6 or h > 0.15 * height or w < 2 * h:
+            continue
+        # Text leaves gaps between strokes, solid shapes and lone edges don't
+        row = edges[y:y + h, x:x + w]
+        if not 0.15 <= cv2.countNonZero(row) / (w * h) <= 0.85:
+            continue
+        # and is made of many glyph or word sized pieces as tall as the row, unlike a border
+        _, _, pieces, _ = cv2.connectedComponentsWithStats(row)
+        pieces = pieces[1:]
+        glyphs = pieces[
+            (pieces[:, cv2.CC_STAT_WIDTH] <= 4 * h) & (pieces[:, cv2.CC_STAT_HEIGHT] >= h / 2),
+            cv2.CC_STAT_WIDTH,
+        ]
+        if len(glyphs) < 3 or glyphs.sum() < 0.3 * w:
+            continue
+        boxes.append([round(value / scale) for value in (x, y, x + w, y + h)])
+    return boxes
+
+
+def merge_text_regions(
+    boxes: List[List[int]], padding: int, max_crops: int, shape: Tuple[int, ...]
+) -> List[List[int]]:
+    """
+    Pads the text regions of a frame and merges the overlapping ones, top to bottom.
+    More than max_crops regions become a single one around all of them.
+    """
+    height, width = shape[:2]
+    merged = [
+        [max(0, x0 - padding), max(0, y0 - padding), min(width, x1 + padding), min(height, y1 + padding)]
+        for x0, y0, x1, y1 in boxes
+    ]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                a, b = merged[i], merged[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    merged[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    if len(merged) > max_crops:
+        merged = [[
+            min(box[0] for box in merged),
+            min(box[1] for box in merged),
+            max(box[2] for box in merged),
+            max(box[3] for box in merged),
+        ]]
+    return sorted(merged, key=lambda box: (box[1], box[0]))
+
+
+def count_text_frames(stats: Optional[dict], checked: int, without_text: int):
+    if stats is None:
+        return
+    stats["ocr_text_frames_checked"] = stats.get("ocr_text_frames_checked", 0) + checked
+    stats["ocr_frames_without_text"] = stats.get("ocr_frames_without_text", 0) + without_text
+    stats["ocr_text_skip_ratio"] = round(
+        stats["ocr_frames_without_text"] / stats["ocr_text_frames_checked"], 4
+    )
+
+
+def log_text_frames(stats: Optional[dict]):
+    if stats and stats.get("ocr_frames_without_text"):
+        logger.info(
+            f"Skipped recognition on {stats['ocr_frames_without_text']} of "
+            f"{stats['ocr_text_frames_checked']} frames without text"
+        )
+
+
+def get_ocr_batch_size(config: DictConfig) -> int:
+    return max(1, int(config.ocr.get("batch_size", 1)))
+
+
+def batched(iterable: Iterable, size: int) -> Generator[list, None, None]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_ocr_frames(
+    video_path: str, config: DictConfig, stats: Optional[dict] = None
+) -> Generator[Tuple[np.ndarray, float, float], None, None]:
+    """
+    Scene frames that need OCR. Scenes whose text is unchanged since the last frame
+    sent to OCR (the cursor moved, a webcam tile or a popup changed) are not OCR'd
+    again; instead the end time of that frame is extended over them.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("ocr_scenes", 0)
+    stats.setdefault("ocr_frames_skipped", 0)
+
+    dedup_cfg = config.ocr.get("dedup") or {}
+    deduplicator = SceneDeduplicator(config) if dedup_cfg.get("enabled", True) else None
+
+    pending = None
+    for frame, start_time, end_time in get_scene_frames(video_path, config.ocr.get("scenes")):
+        stats["ocr_scenes"] += 1
+        if deduplicator is None:
+            yield frame, start_time, end_time
+            continue
+
+        if deduplicator.is_duplicate(frame):
+            pending = (pending[0], pending[1], end_time)
+            stats["ocr_frames_skipped"] += 1
+            continue
+        if pending is not None:
+            yield pending
+        pending = (frame, start_time, end_time)
+
+    if pending is not None:
+        yield pending
+    if stats["ocr_frames_skipped"]:
+        logger.info(
+            f"Skipped OCR for {stats['ocr_frames_skipped']} of {stats['ocr_scenes']} scenes with unchanged text"
+        )
+
+
+class SceneDeduplicator:
+    """
+    Compares scene frames with the last one kept. Only changes over the text of either
+    frame make a frame new: the cursor, webcam tiles and overlays such as popups don't.
+    A cursor moved over text does, which costs an OCR call but loses nothing.
+    """
+
+    def __init__(self, config: DictConfig):
+        dedup_cfg = config.ocr.get("dedup") or {}
+        self.pixel_threshold = int(dedup_cfg.get("pixel_threshold", 32))
+        self.min_overlay = float(dedup_cfg.get("min_overlay", 0.05))
+        self.max_overlay = float(dedup_cfg.get("max_overlay", 0.25))
+        self.min_area = float((config.ocr.get("text_filter") or {}).get("min_area", 0.0005))
+        self.kept: Optional[np.ndarray] = None
+        self.kept_regions: Optional[List[List[int]]] = None
+
+    def is_duplicate(self, frame: np.ndarray) -> bool:
+        """
+        Whether frame has the text of the last frame kept. If not, frame is kept instead.
+        """
+        if self.kept is not None:
+            changes = find_changes(self.kept, frame, self.pixel_threshold, self.min_overlay, self.max_overlay)
+            if not changes:
+                return True
+            if self.kept_regions is None:
+                self.kept_regions = find_text_regions(self.kept, self.min_area)
+            regions = self.kept_regions + find_text_regions(frame, self.min_area)
+            if not any(_overlaps(box, region) for box in changes for region in regions):
+                return True
+        self.kept = frame
+        self.kept_regions = None
+        return False
+
+
+def find_changes(
+    previous: np.ndarray,
+    frame: np.ndarray,
+    pixel_threshold: int = 32,
+    min_overlay: float = 0.05,
+    max_overlay: float = 0.25,
+) -> List[List[int]]:
+    """
+    Boxes [x0, y0, x1, y1] of the changes between two RGB frames, nearby changed pixels
+    grouped into one box. Overlays are left out with everything inside them: boxes whose
+    outline changed all around, like a popup opened over the slide, at least min_overlay
+    of the frame wide and high and covering at most max_overlay of it.
+    """
+    # Shrinking by a whole factor is several times faster than to TEXT_DETECTION_WIDTH exactly
+    factor = -(-frame.shape[1] // TEXT_DETECTION_WIDTH)
+    if factor > 1:
+        frame = cv2.resize(frame, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+        previous = cv2.resize(previous, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+    height, width = frame.shape[:2]
+
+    # A change of any channel counts, as a popup can differ from the slide in hue alone
+    _, changed = cv2.threshold(cv2.absdiff(frame, previous), pixel_threshold, 255, cv2.THRESH_BINARY)
+    _, changed = cv2.threshold(cv2.cvtColor(changed, cv2.COLOR_RGB2GRAY), 0, 255, cv2.THRESH_BINARY)
+    size = max(3, width // 160)
+    grouped = cv2.dilate(changed, cv2.getStructuringElement(cv2.MORPH_RECT, (size, size)))
+    contours, _ = cv2.findContours(grouped, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes, overlays = [], []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        # The changed pixels, without the margin the grouping added
+        dx, dy, w, h = cv2.boundingRect(changed[y:y + h, x:x + w])
+        x0, y0, x1, y1 = x + dx, y + dy, x + dx + w, y + dy + h
+        if (
+            w >= min_overlay * width
+            and h >= min_overlay * height
+            and w * h <= max_overlay * width * height
+            and _outlined(changed[y0:y1, x0:x1])
+        ):
+            overlays.append([x0, y0, x1, y1])
+        else:
+            boxes.append([x0, y0, x1, y1])
+    return [
+        [value * factor for value in box]
+        for box in boxes
+        if not any(o[0] <= box[0] and o[1] <= box[1] and box[2] <= o[2] and box[3] <= o[3] for o in overlays)
+    ]
+
+
+def _outlined(changed: np.ndarray, band: int = 2, coverage: float = 0.8) -> bool:
+    """
+    Whether the changed pixels of a box run along most of each of its four sides.
+    """
+    sides = (
+        changed[:band].any(axis=0),
+        changed[-band:].any(axis=0),
+        changed[:, :band].any(axis=1),
+        changed[:, -band:].any(axis=1),
+    )
+    return min(side.mean() for side in sides) >= coverage
+
+
+def _overlaps(a: List[int], b: List[int]) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class SceneSampler:
+    """
+    Keeps at most `capacity` evenly spaced frames of the scene being decoded, so a
+    frame near its middle can be picked when the scene ends without seeking back.
+    When full, every other sample is dropped and the sampling stride doubles.
+    """
+
+    def __init__(self, start_frame: int, capacity: int = 8):
+        self.start_frame = start_frame
+        self.capacity = capacity
+        self.stride = 1
+        self.samples: List[Tuple[int, np.ndarray]] = []
+
+    def offer(self, frame_num: int, frame: np.ndarray):
+        if (frame_num - self.start_frame) % self.stride:
+            return
+        self.samples.append((frame_num, frame))
+        if len(self.samples) > self.capacity:
+            self.samples = self.samples[::2]
+            self.stride *= 2
+
+    def split(self, cut_frame: int) -> "SceneSampler":
+        """
+        Ends the current scene at cut_frame. Samples at or after the cut (detectors
+        may report a cut a few frames late) move to the returned sampler of the next scene.
+        """
+        following = SceneSampler(cut_frame, self.capacity)
+        following.samples = [s for s in self.samples if s[0] >= cut_frame]
+        self.samples = [s for s in self.samples if s[0] < cut_frame]
+        return following
+
+    def middle_frame(self, end_frame: int) -> Optional[np.ndarray]:
+        if not self.samples:
+            return None
+        middle = (self.start_frame + end_frame) / 2
+        return min(self.samples, key=lambda s: abs(s[0] - middle))[1]
+
+
+class FastCutDetector:
+    """
+    Finds cuts among subsampled frames for fast mode. A cheap mean grey-level
+    difference between consecutive analysed frames picks candidate cuts, and
+    ContentDetector confirms each one by comparing it with the frame before it.
+    """
+
+    def __init__(self, threshold: float, prefilter_threshold: float, min_scene_len: int = 15):
+        self.threshold = threshold
+        self.prefilter_threshold = prefilter_threshold
+        self.min_scene_len = min_scene_len
+        self.candidates = 0
+        self._previous: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+        self._last_cut: Optional[int] = None
+
+    def process_frame(self, frame_num: int, frame: np.ndarray) -> List[int]:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        previous = self._previous
+        self._previous = (frame_num, frame, gray)
+        if previous is None:
+            self._last_cut = frame_num
+            return []
+        previous_num, previous_frame, previous_gray = previous
+        if cv2.absdiff(gray, previous_gray).mean() < self.prefilter_threshold:
+            return []
+
+        self.candidates += 1
+        confirm = ContentDetector(threshold=self.threshold, min_scene_len=0)
+        confirm.process_frame(previous_num, previous_frame)
+        if not confirm.process_frame(frame_num, frame):
+            return []
+        if frame_num - self._last_cut < self.min_scene_len:
+            return []
+        self._last_cut = frame_num
+        return [frame_num]
+
+    def post_process(self, last_frame: int) -> List[int]:
+        return []
+
+
+def get_scene_frames(
+    video_path: str, config: Optional[DictConfig] = None
+) -> Generator[Tuple[np.ndarray, float, float], None, None]:
+    """
+    Detects scenes in a video and yields (frame, start_time, end_time) for each of them,
+    with times in seconds and an RGB frame from near the middle of the scene.
+    Detection and frame capture share one sequential decode, and each scene is yielded
+    as soon as it ends so OCR can start before the whole video is decoded.
+
+    config is the ocr.scenes config. In fast mode only analysis_fps frames a second
+    are decoded and analysed, the others are just grabbed, so cuts are found to
+    within 1 / analysis_fps seconds (see FastCutDetector).
+    """
+    config = config or {}
+    video = open_video(video_path)
+    fps = video.frame_rate
+    threshold = float(config.get("threshold", 27.0))
+    fast = bool(config.get("fast", False))
+    if fast:
+        step = max(1, round(fps / float(config.get("analysis_fps", 5))))
+        prefilter_threshold = float(config.get("prefilter_threshold", 2.0))
+        if prefilter_threshold > 0:
+            detector = FastCutDetector(threshold, prefilter_threshold)
+        else:
+            detector = ContentDetector(threshold=threshold)
+    else:
+        step = 1
+        detector = ContentDetector(threshold=threshold)
+    width = config.get("width")
+    if width:
+        downscale = video.frame_size[0] / int(width)
+    else:
+        downscale = compute_downscale_factor(video.frame_size[0])
+
+    sampler = SceneSampler(0)
+    last_frame = -1
+    analysed = 0
+    while True:
+        if (last_frame + 1) % step:
+            # Grabbing a frame skips converting and copying it
+            if not video.read(decode=False):
+                break
+            last_frame = video.position.frame_num
             continue
+        frame = video.read()
+        if frame is False:
+            break
+        frame_num = video.position.frame_num
+        last_frame = frame_num
+        analysed += 1
+
+        if downscale > 1:
+            small = cv2.resize(
+                frame,
+                (round(frame.shape[1] / downscale), round(frame.shape[0] / downscale)),
+                interpolation=cv2.INTER_AREA if fast else cv2.INTER_LINEAR,
+            )
+        else:
+            small = frame
+
+        for cut in detector.process_frame(frame_num, small):
+            following = sampler.split(cut)
+            scene = _close_scene(sampler, cut, fps)
+            if scene is not None:
+                yield scene
+            sampler = following
+        sampler.offer(frame_num, frame)
+
+    if last_frame < 0:
+        logger.warning(f"Could not read any frames from {video_path}")
+        return
+    if fast:
+        checked = getattr(detector, "candidates", analysed)
+        logger.info(
+            f"Analysed {analysed} of {last_frame + 1} frames for scene cuts, "
+            f"{checked} checked by ContentDetector"
+        )
+    for cut in detector.post_process(last_frame):
+        following = sampler.split(cut)
+        scene = _close_scene(sampler, cut, fps)
+        if scene is not None:
+            yield scene
+        sampler = following
+    scene = _close_scene(sampler, last_frame + 1, fps)
+    if scene is not None:
+        yield scene
 
-        # Run OCR
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        yield frame_rgb, start_time, end_time
 
-    cap.release()
-    video_manager.release()
+def _close_scene(
+    sampler: SceneSampler, end_frame: int, fps: float
+) -> Optional[Tuple[np.ndarray, float, float]]:
+    frame = sampler.middle_frame(end_frame)
+    if frame is None:
+        logger.warning(f"No frame captured for scene at {sampler.start_frame / fps:.1f}s")
+        return None
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return frame_rgb, sampler.start_frame / fps, end_frame / fps
@@ -0,0 +1,179 @@
+import base64
+import logging
+from typing import Iterable, List, Optional, Set, Tuple, Type, Union
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .models import (
+    Job,
+    JobResponse,
+    Meeting,
+    JobSummaryResponse,
+    TranscriptEvent,
+    OnScreenEvent,
+    IntelligentNote,
+)
+
+logger = logging.getLogger(__name__)
+
+Event = Union[TranscriptEvent, OnScreenEvent]
+
+EVENT_MODELS = {"transcript": TranscriptEvent, "ocr": OnScreenEvent}
+EVENT_FIELDS = {"transcript_events": TranscriptEvent, "ocr_events": OnScreenEvent}
+JOB_FIELDS = set(JobResponse.model_fields)
+# Always returned, whatever fields= asks for
+REQUIRED_JOB_FIELDS = {"job_id", "job_status"}
+
+
+def parse_fields(fields: Optional[str]) -> Set[str]:
+    """
+    Parses a comma separated fields= parameter of the job endpoint.
+    Raises ValueError on unknown fields.
+    """
+    if not fields:
+        return set(JOB_FIELDS)
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = selected - JOB_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return selected | REQUIRED_JOB_FIELDS
+
+
+def select_events(
+    model: Type[Event], job_id: str, start: Optional[float] = None, end: Optional[float] = None
+):
+    """
+    Events of a job ordered by time. start/end keep the events overlapping that window.
+    """
+    query = select(model).where(model.job_id == job_id)
+    if start is not None:
+        query = query.where(model.end >= start)
+    if end is not None:
+        query = query.where(model.start <= end)
+    return query.order_by(model.start, model.id)
+
+
+def encode_cursor(event: Event) -> str:
+    return base64.urlsafe_b64encode(f"{event.start!r}:{event.id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        start, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(start), int(event_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def get_event_page(
+    session: AsyncSession,
+    model: Type[Event],
+    job_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> Tuple[List[Event], Optional[str]]:
+    """
+    Returns up to `limit` events after `cursor` and the cursor of the next page,
+    which is None on the last page. Pages are keyed on (start, id), so events
+    saved while a job runs don't shift the pages already read.
+    """
+    query = select_events(model, job_id, start, end)
+    if cursor:
+        cursor_start, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                model.start > cursor_start,
+                and_(model.start == cursor_start, model.id > cursor_id),
+            )
+        )
+    events = (await session.exec(query.limit(limit + 1))).all()
+    if len(events) > limit:
+        return events[:limit], encode_cursor(events[limit - 1])
+    return events, None
+
+
+async def job_response_data(
+    session: AsyncSession,
+    job: Job,
+    fields: Iterable[str],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> dict:
+    """
+    Values of the requested JobResponse fields. Event lists are only queried
+    when asked for, and filtered to the start/end window.
+    """
+    data = {}
+    for name in fields:
+        if name in EVENT_FIELDS:
+            query = select_events(EVENT_FIELDS[name], job.job_id, start, end)
+            data[name] = (await session.exec(query)).all()
+        elif name == "intelligent_notes":
+            query = select(IntelligentNote).where(IntelligentNote.job_id == job.job_id)
+            data[name] = (await session.exec(query.order_by(IntelligentNote.id))).all()
+        else:
+            data[name] = getattr(job, name)
+    return data
+
+
+def _count(model):
+    return (
+        select(func.count(model.id))
+        .where(model.job_id == Job.job_id)
+        .correlate(Job)
+        .scalar_subquery()
+    )
+
+
+def select_job_summaries(meeting_id: int):
+    """
+    Event counts of every job of a meeting, computed by the database in one query
+    instead of loading the events. Jobs that didn't record a duration fall back
+    to the end of their last transcript event.
+    """
+    transcript_end = (
+        select(func.max(TranscriptEvent.end))
+        .where(TranscriptEvent.job_id == Job.job_id)
+        .correlate(Job)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Job.job_id,
+            Job.job_status,
+            Job.time_started,
+            func.coalesce(Job.duration, transcript_end).label("duration"),
+            Job.processed_seconds,
+            _count(TranscriptEvent).label("transcript_event_count"),
+            _count(OnScreenEvent).label("ocr_event_count"),
+            _count(IntelligentNote).label("intelligent_note_count"),
+        )
+        .where(Job.meeting_id == meeting_id)
+        .order_by(Job.time_started)
+    )
+
+
+async def get_job_summaries(
+    session: AsyncSession, meeting_id: int
+) -> List[JobSummaryResponse]:
+    query = select_job_summaries(meeting_id)
+    return [JobSummaryResponse(**row._mapping) for row in await session.exec(query)]
+
+
+async def get_meeting_with_events(
+    session: AsyncSession, meeting_id: int
+) -> Optional[Meeting]:
+    """
+    Loads a meeting with all jobs and their events up front, since relationships
+    can't be loaded lazily on an async session.
+    """
+    jobs = selectinload(Meeting.jobs)
+    query = select(Meeting).where(Meeting.id == meeting_id).options(
+        jobs.selectinload(Job.transcript_events),
+        jobs.selectinload(Job.ocr_events),
+        jobs.selectinload(Job.intelligent_notes),
+    )
+    return (await session.exec(query)).first()
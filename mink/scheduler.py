@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Callable, List, Optional
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """
+    Runs at most `max_concurrent` jobs at a time from a bounded priority queue.
+    Higher priority jobs run first; equal priorities run in submission order.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[Job], None],
+        max_concurrent: int,
+        max_queued: int,
+        initial_job_seconds: float = 120.0,
+    ):
+        assert max_concurrent > 0, "max_concurrent_jobs should be at least 1"
+        # Every job passes through the queue, even when a slot is free
+        assert max_queued > 0, "max_queued_jobs should be at least 1"
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+
+        self._run = run
+        self._queue: List[tuple] = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._completed = 0
+        # Exponential moving average of job durations, used for wait estimates
+        self._avg_job_seconds = initial_job_seconds
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+
+    def start(self):
+        logger.info(
+            f"Starting job scheduler with {self.max_concurrent} slot(s) and a queue of {self.max_queued}"
+        )
+        for index in range(self.max_concurrent):
+            thread = threading.Thread(
+                target=self._loop, name=f"mink-job-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            queued = len(self._queue)
+        if queued:
+            logger.warning(f"Scheduler stopped with {queued} job(s) still queued")
+
+    def is_full(self) -> bool:
+        with self._cond:
+            return len(self._queue) >= self.max_queued
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a queue slot is expected to free up.
+        """
+        with self._cond:
+            return max(1, math.ceil(self._avg_job_seconds / self.max_concurrent))
+
+    def submit(self, job: Job, priority: int = 0) -> float:
+        """
+        Queues a job. Returns its estimated wait in seconds, or raises
+        QueueFullError when the queue is at capacity.
+        """
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                raise QueueFullError(self.retry_after())
+            wait = self._estimate_wait(ahead=self._count_ahead(priority))
+            heapq.heappush(self._queue, (-priority, next(self._order), job))
+            self._cond.notify()
+        logger.info(f"Job {job.job_id}: Queued with priority {priority}, estimated wait {wait:.0f}s")
+        return wait
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                "running": self._running,
+                "queued": len(self._queue),
+                "max_concurrent_jobs": self.max_concurrent,
+                "max_queued_jobs": self.max_queued,
+                "completed": self._completed,
+                "avg_job_seconds": self._avg_job_seconds,
+                "estimated_wait_seconds": self._estimate_wait(ahead=len(self._queue)),
+            }
+
+    def _count_ahead(self, priority: int) -> int:
+        # Entries are stored with negated priority
+        return sum(1 for entry in self._queue if -entry[0] >= priority)
+
+    def _estimate_wait(self, ahead: int) -> float:
+        """
+        Estimated seconds before a job with `ahead` queued jobs in front of it starts.
+        Must be called while holding the lock.
+        """
+        busy = self._running + ahead
+        if busy < self.max_concurrent:
+            return 0.0
+        rounds = (busy - self.max_concurrent) // self.max_concurrent + 1
+        return rounds * self._avg_job_seconds
+
+    def _next_job(self) -> Optional[Job]:
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+            _, _, job = heapq.heappop(self._queue)
+            self._running += 1
+            return job
+
+    def _loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            started = time.monotonic()
+            try:
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Job {job.job_id}: Unhandled error in job: {e}")
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._running -= 1
+                    self._completed += 1
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageSkipped(Exception):
+    pass
+
+
+class StageGraph:
+    """
+    Runs the stages of a job, each in its own thread as soon as the stages it
+    depends on have succeeded. A stage whose dependency failed is skipped.
+    Stages can also wait on other stages themselves, with a timeout, through result().
+
+    timings maps each stage to its status and start/end times (epoch seconds),
+    and on_update is called with a copy of it whenever a stage starts or ends.
+    """
+
+    def __init__(self, name: str, on_update: Optional[Callable[[dict], None]] = None):
+        self.name = name
+        self.on_update = on_update
+        self.timings: Dict[str, dict] = {}
+        self._stages: Dict[str, tuple] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, fn: Callable[[], Any], after: Iterable[str] = ()):
+        after = tuple(after)
+        for dep in after:
+            if dep not in self._stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self._stages[name] = (fn, after)
+        self._futures[name] = Future()
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Waits for a stage and returns its result. Raises concurrent.futures.TimeoutError
+        if it isn't done within timeout, or the stage's exception if it failed.
+        """
+        return self._futures[name].result(timeout)
+
+    def succeeded(self, name: str) -> bool:
+        future = self._futures[name]
+        return future.done() and future.exception() is None
+
+    def run(self):
+        """
+        Runs all stages and returns once every one of them is done.
+        """
+        with ThreadPoolExecutor(
+            max_workers=max(1, len(self._stages)), thread_name_prefix=self.name
+        ) as executor:
+            for name in self._stages:
+                executor.submit(self._run_stage, name)
+
+    def _update(self, name: str, **values):
+        with self._lock:
+            self.timings.setdefault(name, {}).update(values)
+            timings = {stage: dict(values) for stage, values in self.timings.items()}
+        if self.on_update is not None:
+            try:
+                self.on_update(timings)
+            except Exception as e:
+                logger.error(f"{self.name}: Failed to record stage times: {e}")
+
+    def _run_stage(self, name: str):
+        fn, after = self._stages[name]
+        future = self._futures[name]
+        for dep in after:
+            try:
+                self._futures[dep].result()
+            except Exception:
+                logger.info(f"{self.name}: Skipping stage {name}, stage {dep} failed")
+                self._update(name, status="skipped")
+                future.set_exception(StageSkipped(f"Stage {dep} failed"))
+                return
+
+        start = time.time()
+        self._update(name, status="running", start=start)
+        try:
+            result = fn()
+        except Exception as e:
+            logger.error(f"{self.name}: Stage {name} failed: {e}")
+            self._update(name, status="failed", end=time.time())
+            future.set_exception(e)
+            return
+        end = time.time()
+        logger.info(f"{self.name}: Stage {name} finished in {end - start:.1f}s")
+        self._update(name, status="done", end=end)
+        future.set_result(result)
@@ -1,50 +1,96 @@
 import logging
-from typing import List
-from faster_whisper import WhisperModel, BatchedInferencePipeline
+import math
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Generator, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+from faster_whisper.vad import VadOptions, get_speech_timestamps
 from omegaconf import DictConfig
+from .devices import get_device_settings
 from .models import TranscriptEvent
 
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATE = 16000
 
-def process_transcription(
-    video_path: str, job_id: str, config: DictConfig
-) -> List[TranscriptEvent]:
+# (start, end, text) with times in seconds
+Segment = Tuple[float, float, str]
+
+
+def load_transcription_model(
+    config: DictConfig,
+) -> Union[BatchedInferencePipeline, "ParallelTranscriber"]:
     """
-    Transcribes a video file using faster-whisper with batched inference.
+    Loads the Whisper model described by the transcript config.
     """
-    logger.info(f"Starting transcription for {video_path}")
+    parallel_cfg = config.transcript.get("parallel") or {}
+    if parallel_cfg.get("enabled", False):
+        return ParallelTranscriber(config)
 
     model_size = config.transcript.model_size
-    compute_type = config.transcript.precision
-    device = "cuda"
+    settings = get_device_settings(config)
+    device = settings["device"]
+    compute_type = settings["precision"]
 
     logger.info(f"Loading Whisper model: {model_size} on {device} with {compute_type}")
+    model = WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=settings["cpu_threads"],
+        num_workers=settings["num_workers"],
+    )
+    return BatchedInferencePipeline(model=model)
+
+
+def process_transcription(
+    video_path: str,
+    job_id: str,
+    config: DictConfig,
+    batched_model: Optional[Union[BatchedInferencePipeline, "ParallelTranscriber"]] = None,
+    on_events: Optional[Callable[[List[TranscriptEvent], float, Optional[float]], None]] = None,
+) -> List[TranscriptEvent]:
+    """
+    Transcribes a video file using faster-whisper with batched inference, or in
+    parallel CPU chunks when transcript.parallel is enabled.
+    A preloaded model can be passed in to avoid loading it for every job.
+    on_events is called with each new event, the seconds transcribed so far and
+    the total duration.
+    """
+    logger.info(f"Starting transcription for {video_path}")
 
     try:
-        model = WhisperModel(model_size, device=device, compute_type=compute_type)
-        batched_model = BatchedInferencePipeline(model=model)
+        if batched_model is None:
+            batched_model = load_transcription_model(config)
 
-        batch_size = config.transcript.batch_size
-        logger.info(f"Transcribing with batch_size={batch_size}")
+        if isinstance(batched_model, ParallelTranscriber):
+            segments, duration = batched_model.transcribe(video_path)
+        else:
+            batch_size = get_device_settings(config)["batch_size"]
+            logger.info(f"Transcribing with batch_size={batch_size}")
 
-        segments, info = batched_model.transcribe(
-            video_path,
-            vad_filter=True,
-            batch_size=batch_size,
-        )
+            segments, info = batched_model.transcribe(
+                video_path,
+                vad_filter=True,
+                batch_size=batch_size,
+            )
+            segments = ((s.start, s.end, s.text) for s in segments)
+            duration = info.duration
 
         events = []
-        for segment in segments:
-            events.append(
-                TranscriptEvent(
-                    speaker_name=None,
-                    content=segment.text,
-                    start=float(segment.start),
-                    end=float(segment.end),
-                    job_id=job_id,
-                )
+        for start, end, text in segments:
+            event = TranscriptEvent(
+                speaker_name=None,
+                content=text,
+                start=float(start),
+                end=float(end),
+                job_id=job_id,
             )
+            events.append(event)
+            if on_events is not None:
+                on_events([event], float(end), duration)
 
         logger.info(f"Transcription complete. Found {len(events)} events.")
         return events
@@ -52,3 +98,147 @@ def process_transcription(
     except Exception as e:
         logger.error(f"Error during transcription: {e}")
         raise
+
+
+def split_on_silence(
+    audio: np.ndarray, num_chunks: int, min_silence_ms: int = 500
+) -> List[Tuple[int, int]]:
+    """
+    Splits audio into about num_chunks equally long (start, end) sample ranges.
+    Every cut is placed in the middle of a silence found by VAD, so no word is split.
+    """
+    total = len(audio)
+    if num_chunks <= 1:
+        return [(0, total)]
+
+    speech = get_speech_timestamps(
+        audio, VadOptions(min_silence_duration_ms=min_silence_ms), sampling_rate=SAMPLE_RATE
+    )
+    gaps = [
+        (speech[i]["end"] + speech[i + 1]["start"]) // 2 for i in range(len(speech) - 1)
+    ]
+    if not gaps:
+        return [(0, total)]
+
+    cuts = []
+    for k in range(1, num_chunks):
+        target = total * k // num_chunks
+        cut = min(gaps, key=lambda gap: abs(gap - target))
+        if not cuts or cut > cuts[-1]:
+            cuts.append(cut)
+
+    bounds = [0] + cuts + [total]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def stitch_segments(
+    chunks: Iterable[List[Segment]], max_overlap_words: int = 5
+) -> Generator[Segment, None, None]:
+    """
+    Joins the segments of consecutive chunks. Near a boundary, a segment that repeats
+    the previous one is dropped and words repeating the end of the previous segment
+    are trimmed from its start.
+    """
+    prev: Optional[Segment] = None
+    for chunk in chunks:
+        at_boundary = True
+        for start, end, text in chunk:
+            if prev is not None:
+                prev_start, prev_end, prev_text = prev
+                if at_boundary and start < prev_end + 1.0:
+                    if _normalize(text) == _normalize(prev_text):
+                        continue
+                    text = _trim_repeated_words(prev_text, text, max_overlap_words)
+                    if not text.strip():
+                        continue
+                start = max(start, prev_end)
+            prev = (start, max(start, end), text)
+            yield prev
+            at_boundary = False
+
+
+def _normalize(text: str) -> str:
+    return " ".join(word.strip(".,!?;:").lower() for word in text.split())
+
+
+def _trim_repeated_words(prev_text: str, text: str, max_words: int) -> str:
+    prev_words = _normalize(prev_text).split()
+    words = text.split()
+    normalized = _normalize(text).split()
+    for n in range(min(max_words, len(prev_words), len(words)), 0, -1):
+        if prev_words[-n:] == normalized[:n]:
+            return " " + " ".join(words[n:])
+    return text
+
+
+# Model of a chunk process, loaded once by _init_chunk_worker
+_chunk_model: Optional[WhisperModel] = None
+
+
+def _init_chunk_worker(model_size: str, compute_type: str, cpu_threads: int):
+    global _chunk_model
+    _chunk_model = WhisperModel(
+        model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads
+    )
+
+
+def _warm_up_chunk_worker() -> bool:
+    return _chunk_model is not None
+
+
+def _transcribe_chunk(audio: np.ndarray, offset: float) -> List[Segment]:
+    segments, _ = _chunk_model.transcribe(audio, vad_filter=True)
+    return [(offset + s.start, offset + s.end, s.text) for s in segments]
+
+
+class ParallelTranscriber:
+    """
+    Transcribes long recordings on CPU by cutting the audio at silences and running
+    the chunks on a warm pool of processes, each with its own Whisper model and a
+    share of the CPU threads.
+    """
+
+    def __init__(self, config: DictConfig):
+        parallel_cfg = config.transcript.parallel
+        self.processes = int(parallel_cfg.get("processes") or os.cpu_count() or 1)
+        self.min_chunk_seconds = float(parallel_cfg.get("min_chunk_seconds", 60))
+        cpu_threads = int(
+            parallel_cfg.get("cpu_threads") or max(1, (os.cpu_count() or 1) // self.processes)
+        )
+        model_size = config.transcript.model_size
+        compute_type = (config.transcript.get("cpu") or {}).get("precision", "int8")
+
+        logger.info(
+            f"Loading {self.processes} Whisper model(s): {model_size} on cpu with {compute_type}, "
+            f"{cpu_threads} thread(s) each"
+        )
+        self.executor = ProcessPoolExecutor(
+            self.processes,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_chunk_worker,
+            initargs=(model_size, compute_type, cpu_threads),
+        )
+        # Processes are started on demand, so start all of them now to load the models
+        warm_ups = [self.executor.submit(_warm_up_chunk_worker) for _ in range(self.processes)]
+        for warm_up in warm_ups:
+            warm_up.result()
+
+    def transcribe(self, video_path: str) -> Tuple[Iterable[Segment], float]:
+        """
+        Returns the stitched segments and the audio duration. Like faster-whisper,
+        segments are produced lazily, as soon as their chunk is transcribed.
+        """
+        audio = decode_audio(video_path, sampling_rate=SAMPLE_RATE)
+        duration = len(audio) / SAMPLE_RATE
+        num_chunks = max(1, min(self.processes, math.floor(duration / self.min_chunk_seconds)))
+        chunks = split_on_silence(audio, num_chunks)
+        logger.info(f"Transcribing {duration:.0f}s of audio in {len(chunks)} parallel chunk(s)")
+
+        futures = [
+            self.executor.submit(_transcribe_chunk, audio[start:end], start / SAMPLE_RATE)
+            for start, end in chunks
+        ]
+        return stitch_segments(future.result() for future in futures), duration
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
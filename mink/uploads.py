@@ -0,0 +1,169 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import AsyncIterator, Dict, Optional
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "/tmp/mink"
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def _write_chunk(buffer, hasher, chunk: bytes):
+    buffer.write(chunk)
+    hasher.update(chunk)
+
+
+def hash_file(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def save_upload(
+    file: UploadFile, dest_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> str:
+    """
+    Copies an uploaded file to dest_path chunk by chunk without blocking the event loop.
+    Returns the sha256 of the content.
+    """
+    hasher = hashlib.sha256()
+    buffer = await asyncio.to_thread(open, dest_path, "wb")
+    try:
+        while chunk := await file.read(chunk_size):
+            await asyncio.to_thread(_write_chunk, buffer, hasher, chunk)
+    finally:
+        await asyncio.to_thread(buffer.close)
+    return hasher.hexdigest()
+
+
+class UploadOffsetError(Exception):
+    def __init__(self, expected: int):
+        super().__init__(f"Upload offset mismatch, expected {expected}")
+        self.expected = expected
+
+
+class ResumableUpload:
+    """
+    A file that is uploaded in pieces over several requests. The received bytes
+    live in `<upload_id>.part` and the metadata in `<upload_id>.json`, so an upload
+    can be resumed from its current offset after a dropped connection or a restart.
+    """
+
+    def __init__(self, upload_id: str, filename: str, size: Optional[int]):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size
+        self.lock = asyncio.Lock()
+        # Only valid while the server keeps running; rebuilt from disk otherwise
+        self._hasher = hashlib.sha256()
+        self._hashed = 0
+
+    @property
+    def part_path(self) -> str:
+        return os.path.join(UPLOAD_DIR, f"{self.upload_id}.part")
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(UPLOAD_DIR, f"{self.upload_id}.json")
+
+    @property
+    def offset(self) -> int:
+        return os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+
+    @property
+    def is_complete(self) -> bool:
+        return self.size is None or self.offset == self.size
+
+    def to_dict(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+        }
+
+    async def append(self, offset: int, stream: AsyncIterator[bytes]) -> int:
+        """
+        Appends a request body at `offset`, which has to match what was received so far.
+        Whatever arrives before a disconnect is kept. Returns the new offset.
+        """
+        async with self.lock:
+            current = self.offset
+            if offset != current:
+                raise UploadOffsetError(current)
+            if self._hashed != current:
+                self._hasher = None
+
+            buffer = await asyncio.to_thread(open, self.part_path, "ab")
+            try:
+                async for chunk in stream:
+                    if self.size is not None and current + len(chunk) > self.size:
+                        raise ValueError(f"Upload is larger than the declared {self.size} bytes")
+                    if self._hasher is not None:
+                        await asyncio.to_thread(_write_chunk, buffer, self._hasher, chunk)
+                        self._hashed += len(chunk)
+                    else:
+                        await asyncio.to_thread(buffer.write, chunk)
+                    current += len(chunk)
+            finally:
+                await asyncio.to_thread(buffer.close)
+            return current
+
+    async def finish(self, dest_path: str) -> str:
+        """
+        Moves the completed upload to dest_path and returns its sha256.
+        """
+        async with self.lock:
+            if self._hasher is not None and self._hashed == self.offset:
+                content_hash = self._hasher.hexdigest()
+            else:
+                logger.info(f"Upload {self.upload_id}: Rehashing file after a restart")
+                content_hash = await asyncio.to_thread(hash_file, self.part_path)
+            await asyncio.to_thread(os.replace, self.part_path, dest_path)
+            await asyncio.to_thread(os.remove, self.meta_path)
+            return content_hash
+
+
+class UploadStore:
+    def __init__(self):
+        self._uploads: Dict[str, ResumableUpload] = {}
+
+    def create(self, filename: str, size: Optional[int]) -> ResumableUpload:
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        upload = ResumableUpload(str(uuid.uuid4()), os.path.basename(filename), size)
+        with open(upload.meta_path, "w") as f:
+            json.dump({"filename": upload.filename, "size": size}, f)
+        open(upload.part_path, "wb").close()
+        self._uploads[upload.upload_id] = upload
+        logger.info(f"Upload {upload.upload_id}: Created for {upload.filename} ({size} bytes)")
+        return upload
+
+    def get(self, upload_id: str) -> Optional[ResumableUpload]:
+        upload = self._uploads.get(upload_id)
+        if upload is not None:
+            return upload
+
+        # The server may have restarted since the upload began
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            return None
+        meta_path = os.path.join(UPLOAD_DIR, f"{upload_id}.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        upload = ResumableUpload(upload_id, meta["filename"], meta["size"])
+        upload._hasher = None
+        self._uploads[upload_id] = upload
+        return upload
+
+    def remove(self, upload_id: str):
+        self._uploads.pop(upload_id, None)
@@ -0,0 +1,315 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+import multiprocessing as mp
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from omegaconf import DictConfig
+from .metrics import model_load_seconds, timed
+
+logger = logging.getLogger(__name__)
+
+WORKER_KINDS = ("transcription", "ocr")
+
+
+def _load_model(kind: str, config: DictConfig):
+    if kind == "transcription":
+        from .transcription import load_transcription_model
+
+        return load_transcription_model(config)
+    else:
+        from .ocr import load_ocr_model
+
+        return load_ocr_model(config)
+
+
+class EventBatcher:
+    """
+    Buffers the events a task produces and sends them on in batches, once
+    `max_events` are buffered or `max_seconds` have passed since the last send.
+    Each send is (events, processed_seconds, duration).
+    """
+
+    def __init__(self, send: Callable[[tuple], None], max_events: int, max_seconds: float):
+        self.send = send
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self.events: List = []
+        self.processed = 0.0
+        self.duration: Optional[float] = None
+        self._last_send = time.monotonic()
+        self._sent_processed = 0.0
+
+    def add(self, events: List, processed: float, duration: Optional[float] = None):
+        self.events.extend(events)
+        self.processed = max(self.processed, processed)
+        if duration is not None:
+            self.duration = duration
+        if (
+            len(self.events) >= self.max_events
+            or time.monotonic() - self._last_send >= self.max_seconds
+        ):
+            self.flush()
+
+    def flush(self):
+        if not self.events and self.processed == self._sent_processed:
+            return
+        self.send((self.events, self.processed, self.duration))
+        self.events = []
+        self._sent_processed = self.processed
+        self._last_send = time.monotonic()
+
+
+def _run_task(
+    kind: str,
+    model,
+    video_path: str,
+    job_id: str,
+    config: DictConfig,
+    on_events: Callable[[List, float, Optional[float]], None],
+) -> dict:
+    """
+    Runs one job on a loaded model. Events are reported through on_events as they
+    are produced; the per-job stats are returned, with the seconds spent in each
+    step under "timings".
+    """
+    stats = {}
+    timings = {}
+    if kind == "transcription":
+        from .transcription import process_transcription
+
+        with timed(timings, "asr"):
+            process_transcription(video_path, job_id, config, model, on_events)
+    else:
+        from .ocr import process_ocr
+
+        process_ocr(video_path, job_id, config, model, stats, on_events, timings)
+    return {**stats, "timings": timings}
+
+
+def _worker_loop(
+    kind: str, index: int, config: DictConfig, tasks: mp.Queue, results: mp.Queue, claims
+):
+    """
+    Entry point of a pool process. Loads the model once and then serves tasks
+    until it receives None. Messages sent back are (message, task_id, index, payload).
+    claims[index] holds the task being processed, or -1.
+    """
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    try:
+        model = _load_model(kind, config)
+    except Exception as e:
+        logger.error(f"{kind} worker {index}: Failed to load model: {e}")
+        results.put(("dead", None, index, str(e)))
+        return
+    results.put(("ready", None, index, time.perf_counter() - start))
+
+    workers_cfg = config.get("workers") or {}
+    flush_events = int(workers_cfg.get("flush_events", 50))
+    flush_seconds = float(workers_cfg.get("flush_seconds", 5.0))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, job_id, video_path = task
+        # Written to shared memory right away, unlike queued messages, so the pool
+        # knows which task to fail even if this process crashes before sending any
+        claims[index] = task_id
+        batcher = EventBatcher(
+            lambda payload: results.put(("partial", task_id, index, payload)),
+            flush_events,
+            flush_seconds,
+        )
+        try:
+            stats = _run_task(kind, model, video_path, job_id, config, batcher.add)
+            batcher.flush()
+            message = ("done", task_id, index, stats)
+        except Exception as e:
+            logger.error(f"Job {job_id}: {kind} worker {index} failed: {e}")
+            message = ("error", task_id, index, str(e))
+        claims[index] = -1
+        results.put(message)
+
+    # Models that own helper processes release them here
+    close = getattr(model, "close", None)
+    if close is not None:
+        close()
+
+
+class WorkerPool:
+    """
+    A fixed set of long-lived processes that keep a transcription or OCR model
+    warm and take jobs from a shared queue.
+    """
+
+    def __init__(self, kind: str, size: int, config: DictConfig):
+        assert kind in WORKER_KINDS, f"Unknown worker kind: {kind}"
+        assert size > 0, f"The {kind} pool needs at least one worker"
+        self.kind = kind
+        self.size = size
+        self.config = config
+
+        self._ctx = mp.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        # Task each worker took off the queue, -1 when idle
+        self._claims = self._ctx.RawArray("q", [-1] * size)
+        self._workers: Dict[int, mp.Process] = {}
+        self._futures: Dict[int, Future] = {}
+        self._updates: Dict[int, queue.Queue] = {}
+        self._events: Dict[int, List] = {}
+        self._failed = set()
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._running = False
+        self._collector: Optional[threading.Thread] = None
+
+    def start(self):
+        logger.info(f"Starting {self.size} {self.kind} worker(s)")
+        self._running = True
+        for index in range(self.size):
+            self._spawn(index)
+        self._collector = threading.Thread(
+            target=self._collect, name=f"{self.kind}-collector", daemon=True
+        )
+        self._collector.start()
+
+    def submit(
+        self, job_id: str, video_path: str, updates: Optional[queue.Queue] = None
+    ) -> Future:
+        """
+        Queues a video for processing. The returned future resolves to the
+        list of events produced by the worker and a dict of per-job stats.
+        While the task runs, batches of new events are put on `updates` as
+        (kind, events, processed_seconds, duration).
+        """
+        if not self._running:
+            raise RuntimeError(f"The {self.kind} pool is not running")
+        if len(self._failed) == self.size:
+            raise RuntimeError(f"No {self.kind} worker could load its model")
+        future = Future()
+        with self._lock:
+            task_id = next(self._task_ids)
+            self._futures[task_id] = future
+            self._events[task_id] = []
+            if updates is not None:
+                self._updates[task_id] = updates
+        self._tasks.put((task_id, job_id, video_path))
+        return future
+
+    def shutdown(self, timeout: float = 10.0):
+        if not self._running:
+            return
+        logger.info(f"Stopping {self.kind} worker(s)")
+        self._running = False
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout)
+
+        self._fail_all(RuntimeError(f"The {self.kind} pool was shut down"))
+
+    def _pop_task(self, task_id: int):
+        with self._lock:
+            self._updates.pop(task_id, None)
+            return self._futures.pop(task_id, None), self._events.pop(task_id, [])
+
+    def _fail_all(self, error: Exception):
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._updates.clear()
+            self._events.clear()
+        for future in futures:
+            future.set_exception(error)
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=_worker_loop,
+            args=(self.kind, index, self.config, self._tasks, self._results, self._claims),
+            name=f"mink-{self.kind}-{index}",
+        )
+        process.start()
+        self._workers[index] = process
+
+    def _collect(self):
+        last_reap = time.monotonic()
+        while self._running:
+            if time.monotonic() - last_reap > 1.0:
+                self._reap()
+                last_reap = time.monotonic()
+            try:
+                message, task_id, index, payload = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            if message == "ready":
+                logger.info(f"{self.kind} worker {index} loaded its model in {payload:.1f}s")
+                model_load_seconds.observe(payload, kind=self.kind)
+            elif message == "dead":
+                logger.error(f"{self.kind} worker {index} could not start: {payload}")
+                self._failed.add(index)
+                if len(self._failed) == self.size:
+                    self._fail_all(RuntimeError(f"No {self.kind} worker could load its model"))
+            elif message == "partial":
+                events, processed, duration = payload
+                with self._lock:
+                    if task_id in self._events:
+                        self._events[task_id].extend(events)
+                    updates = self._updates.get(task_id)
+                if updates is not None:
+                    updates.put((self.kind, events, processed, duration))
+            elif message in ("done", "error"):
+                future, events = self._pop_task(task_id)
+                if future is None:
+                    continue
+                if message == "done":
+                    future.set_result((events, payload))
+                else:
+                    future.set_exception(RuntimeError(payload))
+
+    def _reap(self):
+        """
+        Fails the task of any worker that died mid-job and replaces the worker.
+        """
+        for index, process in list(self._workers.items()):
+            if process.is_alive() or index in self._failed or not self._running:
+                continue
+            logger.error(
+                f"{self.kind} worker {index} exited with code {process.exitcode}, restarting"
+            )
+            # The claim is cleared before a task's result is queued, so a worker
+            # that died idle with "done" still unread has no task to fail
+            task_id = self._claims[index]
+            self._claims[index] = -1
+            if task_id >= 0:
+                future, _ = self._pop_task(task_id)
+                if future is not None:
+                    future.set_exception(
+                        RuntimeError(f"{self.kind} worker {index} died while processing")
+                    )
+            self._spawn(index)
+
+
+def start_worker_pools(config: DictConfig) -> Dict[str, WorkerPool]:
+    workers_cfg = config.get("workers") or {}
+    pools = {}
+    for kind in WORKER_KINDS:
+        pool = WorkerPool(kind, int(workers_cfg.get(kind, 1)), config)
+        pool.start()
+        pools[kind] = pool
+    return pools
+
+
+def stop_worker_pools(pools: Dict[str, WorkerPool]):
+    for pool in pools.values():
+        pool.shutdown()
+    pools.clear()